@@ -0,0 +1,175 @@
+"""
+Throughput benchmarks of GeocatAPI, GeocatBackup and Restore against a local
+GeoNetwork stand-in (see mock_geonetwork.py), runnable offline.
+
+Measured : deep search pages per second, backup records per second (metadata only
+and full GeocatBackup), restore records per second (per record and packed) and the
+peak of memory allocated by geopycat (tracemalloc) for each benchmark.
+The mock runs in its own process so that it doesn't compete with geopycat for the GIL.
+tracemalloc slows down allocations heavily, so the memory peak is measured in a second
+run of each benchmark (skipped with --no-memory).
+
+Usage:
+    python benchmarks/bench_geocat.py [--records n] [--latency s] [--capacity n]
+                                      [--workers n] [--adaptive max] [--output results.json]
+"""
+import argparse
+import contextlib
+import glob
+import io
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from geopycat import settings
+from geopycat.concurrency import AdaptiveLimiter
+from geopycat.geocat import GeocatAPI
+from geopycat.GeocatBackup import GeocatBackup, Restore
+import mock_geonetwork
+
+
+def measure(func, verbose: bool = False, memory: bool = True) -> tuple:
+    """
+    Runs func, then runs it again under tracemalloc if memory.
+    Returns (result, duration in s, memory peak in MB or None)
+    """
+
+    def quiet():
+        return contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO())
+
+    start = time.perf_counter()
+
+    with quiet():
+        result = func()
+
+    duration = time.perf_counter() - start
+    peak = None
+
+    if memory:
+
+        tracemalloc.start()
+
+        with quiet():
+            func()
+
+        peak = tracemalloc.get_traced_memory()[1] / 1024 ** 2
+        tracemalloc.stop()
+
+    return result, duration, peak
+
+
+def count_files(folder: str) -> int:
+    """Returns the number of files in a folder and its subfolders"""
+    return sum(len(files) for _, _, files in os.walk(folder))
+
+
+def count_requests(metrics, endpoint: str) -> int:
+    """Returns the number of requests sent to an endpoint template"""
+    return sum(e["requests"] for e in metrics.to_dict() if e["endpoint"].endswith(endpoint))
+
+
+def run(args) -> list:
+
+    credentials = {"env": "bench", "username": "bench", "password": "bench"}
+
+    if args.adaptive is not None:
+        credentials["limiter"] = AdaptiveLimiter(initial=args.workers, maximum=args.adaptive)
+    results = []
+
+    def add(name, count, unit, duration, peak):
+        results.append({"benchmark": name, "count": count, "unit": unit,
+                        "duration": round(duration, 3), "rate": round(count / duration, 1),
+                        "memory_peak_mb": round(peak, 1) if peak is not None else None})
+
+    with tempfile.TemporaryDirectory() as tmp:
+
+        # Deep search
+        api = GeocatAPI(**credentials)
+        pages = []
+
+        def deep_search():
+            api.metrics.reset()
+            uuids = api.get_uuids()
+            pages.append(count_requests(api.metrics, "_search"))
+            return uuids
+
+        uuids, duration, peak = measure(deep_search, args.verbose, args.memory)
+        add("deep search", pages[0], "pages", duration, peak)
+
+        # Backup of metadata as MEF
+        backup_dir = os.path.join(tmp, "metadata")
+        _, duration, peak = measure(lambda: api.backup_metadata(uuids=uuids, backup_dir=backup_dir,
+                                        with_related=False, workers=args.workers), args.verbose,
+                                        args.memory)
+        add(f"backup_metadata (workers={args.workers})", count_files(backup_dir), "records",
+            duration, peak)
+
+        # Full backup
+        full_dir = os.path.join(tmp, "backup")
+        _, duration, peak = measure(lambda: GeocatBackup(backup_dir=full_dir, **credentials),
+                                        args.verbose, args.memory)
+        add("GeocatBackup", sum(count_files(os.path.join(full_dir, folder)) for folder in
+            ["metadata", "Subtemplates_contacts", "Subtemplates_extents", "Subtemplates_formats"]),
+            "records", duration, peak)
+
+        # Restore
+        mefs = sorted(glob.glob(os.path.join(backup_dir, "*.zip")))
+        restore = Restore(**credentials)
+
+        for pack in [False, True]:
+            report, duration, peak = measure(lambda: restore.restore_metadata_from_mefs(
+                mefs=mefs, workers=args.workers, pack=pack), args.verbose, args.memory)
+            add(f"restore (pack={pack}, workers={args.workers})",
+                sum(1 for r in report if r["success"]), "records", duration, peak)
+
+    return results
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--records", type=int, default=5000)
+    parser.add_argument("--subtemplates", type=int, default=300)
+    parser.add_argument("--record-size", type=int, default=4096,
+                        help="approximate size of a metadata XML in bytes")
+    parser.add_argument("--latency", type=float, default=0.0,
+                        help="delay added by the mock to every response in seconds")
+    parser.add_argument("--capacity", type=int,
+                        help="requests in flight above which the mock is overloaded")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--adaptive", type=int, metavar="MAX",
+                        help="use an AdaptiveLimiter with at most MAX requests in flight")
+    parser.add_argument("--output", help="json file where the results are written")
+    parser.add_argument("--no-memory", dest="memory", action="store_false",
+                        help="don't measure the memory peak")
+    parser.add_argument("--verbose", action="store_true", help="show geopycat's output")
+    args = parser.parse_args()
+
+    ready = multiprocessing.Queue()
+    server = multiprocessing.Process(target=mock_geonetwork.serve, daemon=True, kwargs={
+        "latency": args.latency, "capacity": args.capacity, "ready": ready, "records": args.records,
+        "subtemplates": args.subtemplates, "record_size": args.record_size})
+    server.start()
+
+    settings.ENV["bench"] = f"http://127.0.0.1:{ready.get(timeout=60)}"
+    settings.PROXY = [{}]
+
+    try:
+        results = run(args)
+    finally:
+        server.terminate()
+
+    print(f"{'benchmark':<36}{'count':>8}{'time (s)':>10}{'rate':>20}{'mem peak (MB)':>15}")
+    for r in results:
+        print(f"{r['benchmark']:<36}{r['count']:>8}{r['duration']:>10.2f}"
+                f"{r['rate']:>10.1f} {r['unit'] + '/s':<9}{str(r['memory_peak_mb']):>15}")
+
+    if args.output is not None:
+        with open(args.output, "w") as file:
+            json.dump({"parameters": vars(args), "results": results}, file, indent=4)
@@ -0,0 +1,107 @@
+"""
+Microbenchmark of the namespace translation and metadata fields extraction
+of geopycat.utils against the previous implementations.
+
+Usage:
+    python benchmarks/bench_xpath.py backup_dir [--repeat n]
+
+backup_dir is any folder of a geocat backup, XML files and MEF zip files are read.
+"""
+import argparse
+import os
+import time
+import zipfile
+import xml.etree.ElementTree as ET
+from lxml import etree
+from geopycat import settings
+from geopycat import utils
+
+
+def legacy_url2code(path: str) -> str:
+    for key in settings.NS:
+        path = path.replace("{" + settings.NS[key] + "}", f"{key}:")
+    return path
+
+
+def legacy_code2url(path: str) -> str:
+    for key in settings.NS:
+        path = path.replace(f"{key}:", "{" + settings.NS[key] + "}")
+    return path
+
+
+def legacy_fields(metadata: bytes) -> dict:
+    xml_root = ET.fromstring(metadata)
+
+    fields = {"language": None, "locales": []}
+
+    language = xml_root.find("./gmd:language/gmd:LanguageCode", namespaces=settings.NS)
+    if language is not None:
+        fields["language"] = language.attrib["codeListValue"]
+
+    for lang in xml_root.findall("./gmd:locale//gmd:LanguageCode", namespaces=settings.NS):
+        if lang.attrib["codeListValue"] != fields["language"] and \
+            lang.attrib["codeListValue"] not in fields["locales"]:
+            fields["locales"].append(lang.attrib["codeListValue"])
+
+    uuid = xml_root.find("./gmd:fileIdentifier/gco:CharacterString", namespaces=settings.NS)
+    fields["uuid"] = uuid.text if uuid is not None else None
+
+    title = xml_root.find("./gmd:identificationInfo/*/gmd:citation/gmd:CI_Citation/gmd:title/"
+                            "gco:CharacterString", namespaces=settings.NS)
+    fields["title"] = title.text if title is not None else None
+
+    return fields
+
+
+def read_records(backup_dir: str) -> list:
+    records = []
+    for root, _, files in os.walk(backup_dir):
+        for file in files:
+            path = os.path.join(root, file)
+            if file.endswith(".xml"):
+                with open(path, "rb") as xml:
+                    records.append(xml.read())
+            elif file.endswith(".zip"):
+                with zipfile.ZipFile(path) as archive:
+                    for name in archive.namelist():
+                        if name.endswith("metadata/metadata.xml"):
+                            records.append(archive.read(name))
+    return records
+
+
+def timeit(func, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("backup_dir")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    records = read_records(args.backup_dir)
+    if len(records) == 0:
+        raise SystemExit(f"No XML record found in {args.backup_dir}")
+
+    paths = [utils.xpath_ns_code2url(f"gmd:identificationInfo/*/gmd:citation/gmd:CI_Citation/"
+                f"gmd:title/gco:CharacterString[{i}]") for i in range(1000)]
+
+    results = {
+        "ns url2code (1000 paths)": (
+            timeit(lambda: [legacy_url2code(p) for p in paths], args.repeat),
+            timeit(lambda: [utils.xpath_ns_url2code(p) for p in paths], args.repeat),
+        ),
+        f"fields extraction ({len(records)} records)": (
+            timeit(lambda: [legacy_fields(r) for r in records], args.repeat),
+            timeit(lambda: [utils.get_metadata_fields(etree.fromstring(r)) for r in records],
+                    args.repeat),
+        ),
+    }
+
+    print(f"{'benchmark':<40}{'legacy (s)':>12}{'toolkit (s)':>12}{'speedup':>10}")
+    for name, (legacy, toolkit) in results.items():
+        print(f"{name:<40}{legacy:>12.3f}{toolkit:>12.3f}{legacy / toolkit:>9.1f}x")
@@ -0,0 +1,414 @@
+"""
+Local stand-in of the GeoNetwork 4 API used by geopycat, serving synthetic records.
+Used by the benchmarks to measure geopycat without hitting geocat.ch.
+
+Served endpoints :
+    login (info?type=me, XSRF token), /api/me, search/records/_search (filter
+    context, search_after, total hits), records/{uuid}/formatters/zip|xml, users,
+    groups, vocabularies, unpublish report, harvesters, MEF import (single and
+    multi records), edit session, internal validation, sharing and ownership (single
+    record), selection buckets and batch ownership, sharing, editing, validation and
+    deletion over buckets.
+
+Usage:
+    python benchmarks/mock_geonetwork.py [--port 8080] [--records n] [--latency s]
+                                         [--capacity n]
+"""
+import argparse
+import functools
+import io
+import json
+import re
+import time
+import threading
+import zipfile
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+SUBTEMPLATE_ROOTS = ["che:CHE_CI_ResponsibleParty", "gmd:EX_Extent", "gmd:MD_Format"]
+
+METADATA_TEMPLATE = """<?xml version="1.0" encoding="UTF-8"?>
+<che:CHE_MD_Metadata xmlns:che="http://www.geocat.ch/2008/che" \
+xmlns:gmd="http://www.isotc211.org/2005/gmd" xmlns:gco="http://www.isotc211.org/2005/gco">
+  <gmd:fileIdentifier><gco:CharacterString>{uuid}</gco:CharacterString></gmd:fileIdentifier>
+  <gmd:language><gmd:LanguageCode codeListValue="ger"/></gmd:language>
+  <gmd:identificationInfo><che:CHE_MD_DataIdentification><gmd:citation><gmd:CI_Citation>
+    <gmd:title><gco:CharacterString>Benchmark record {uuid}</gco:CharacterString></gmd:title>
+  </gmd:CI_Citation></gmd:citation>
+  <gmd:abstract><gco:CharacterString>{abstract}</gco:CharacterString></gmd:abstract>
+  </che:CHE_MD_DataIdentification></gmd:identificationInfo>
+</che:CHE_MD_Metadata>
+"""
+
+INFO_TEMPLATE = """<?xml version="1.0" encoding="UTF-8"?>
+<info version="1.1">
+  <general><uuid>{uuid}</uuid><schema>iso19139.che</schema><isTemplate>{is_template}</isTemplate></general>
+  <privileges><group name="all"><operation name="view"/><operation name="download"/></group></privileges>
+</info>
+"""
+
+
+class MockCatalogue():
+    """
+    Synthetic catalogue served by the mock.
+
+    Parameters:
+        records (int): number of metadata records
+        subtemplates (int): number of subtemplates (contacts, extents and formats)
+        users (int): number of users
+        groups (int): number of groups
+        record_size (int): approximate size of a metadata XML in bytes
+    """
+
+    def __init__(self, records: int = 5000, subtemplates: int = 300, users: int = 50,
+                    groups: int = 20, record_size: int = 4096):
+
+        self.record_size = record_size
+
+        self.groups = [{"id": i, "name": f"group_{i}", "logo": ""} for i in range(1, groups + 1)]
+        self.groups.append({"id": 1000, "name": "all", "logo": ""})
+
+        self.users = [{"id": i, "username": f"user_{i}", "enabled": True,
+                        "profile": "Administrator" if i == 1 else "Editor"}
+                        for i in range(1, users + 1)]
+
+        self.documents = [{
+            "uuid": f"bench-md-{i:07d}",
+            "isTemplate": "n",
+            "isHarvested": "false",
+            "isPublishedToAll": "true",
+            "valid": "1",
+            "groupOwner": str(i % groups + 1),
+            "owner": str(i % users + 1),
+            "root": "che:CHE_MD_Metadata",
+            "changeDate": "2024-01-01T00:00:00Z",
+        } for i in range(records)]
+
+        self.documents += [{
+            "uuid": f"bench-ro-{i:07d}",
+            "isTemplate": "s",
+            "isHarvested": "false",
+            "isPublishedToAll": "true",
+            "valid": "1",
+            "groupOwner": "1",
+            "owner": "1",
+            "root": SUBTEMPLATE_ROOTS[i % len(SUBTEMPLATE_ROOTS)],
+            "changeDate": "2024-01-01T00:00:00Z",
+        } for i in range(subtemplates)]
+
+        self.documents.sort(key=lambda document: document["uuid"])
+        self.by_uuid = {document["uuid"]: document for document in self.documents}
+
+    @functools.lru_cache(maxsize=4096)
+    def get_xml(self, uuid: str) -> bytes:
+        """Returns the metadata XML of a record"""
+
+        abstract = "Lorem ipsum dolor sit amet. " * max(1, self.record_size // 28)
+        return METADATA_TEMPLATE.format(uuid=uuid, abstract=abstract).encode("utf-8")
+
+    @functools.lru_cache(maxsize=4096)
+    def get_mef(self, uuid: str) -> bytes:
+        """Returns the single record MEF2 zip of a record"""
+
+        buffer = io.BytesIO()
+
+        with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+            archive.writestr(f"{uuid}/metadata/metadata.xml", self.get_xml(uuid))
+            archive.writestr(f"{uuid}/info.xml", INFO_TEMPLATE.format(
+                uuid=uuid, is_template=self.by_uuid[uuid]["isTemplate"]))
+
+        return buffer.getvalue()
+
+    def search(self, body: dict) -> dict:
+        """
+        Evaluates the term(s) clauses of filter and must_not of an ES search body.
+        must and should clauses (query string, keywords) match every record.
+        """
+
+        clauses = body.get("query", {}).get("bool", {})
+        filters = clauses.get("filter", [])
+        filters = [filters] if isinstance(filters, dict) else filters
+
+        def match(document, clause):
+            if "term" in clause:
+                field, value = next(iter(clause["term"].items()))
+                return document.get(field) == str(value)
+            if "terms" in clause:
+                field, values = next(iter(clause["terms"].items()))
+                return document.get(field) in [str(v) for v in values]
+            return True
+
+        hits = [document for document in self.documents
+                if all(match(document, clause) for clause in filters)
+                and not any(match(document, clause) for clause in clauses.get("must_not", []))]
+
+        total = len(hits)
+        start = body["search_after"][0] if "search_after" in body else body.get("from", 0)
+        size = body.get("size", 10)
+
+        return {
+            "hits": {
+                "total": {"value": total, "relation": "eq"},
+                "hits": [{"_id": document["uuid"], "_source": document, "sort": [start + i + 1]}
+                            for i, document in enumerate(hits[start:start + size])],
+            }
+        }
+
+
+def get_process_report(uuids: list, not_found: int = 0) -> dict:
+    """Returns a processing report of GeoNetwork, successful for uuids"""
+
+    return {
+        "errors": [],
+        "metadataErrors": {},
+        "metadataInfos": {str(i): [{"uuid": uuid, "message": "Metadata processed"}]
+                            for i, uuid in enumerate(uuids)},
+        "numberOfRecordNotFound": not_found,
+        "numberOfRecordsNotEditable": 0,
+        "numberOfNullRecords": 0,
+        "numberOfRecordsWithErrors": 0,
+        "numberOfRecordsProcessed": len(uuids),
+    }
+
+
+def make_handler(catalogue: MockCatalogue, latency: float = 0.0, capacity: int = None):
+    """
+    Returns the request handler class serving catalogue, every response delayed by latency.
+    With capacity, the server is overloaded above capacity requests in flight : the latency
+    grows with the load and requests above twice the capacity get HTTP 503.
+    """
+
+    load = {"in_flight": 0}
+    selections = {}
+    lock = threading.Lock()
+
+    class MockGeonetworkHandler(BaseHTTPRequestHandler):
+
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def log_message(self, format, *args):
+            pass
+
+        def send(self, status: int, data=b"", content_type: str = "application/json",
+                    headers: dict = None):
+
+            if isinstance(data, (dict, list, int)):
+                data = json.dumps(data).encode("utf-8")
+            elif isinstance(data, str):
+                data = data.encode("utf-8")
+
+            with lock:
+                load["in_flight"] += 1
+                in_flight = load["in_flight"]
+
+            try:
+                if capacity is not None and in_flight > 2 * capacity:
+                    status, data = 503, b"Service Unavailable"
+                if capacity is not None and in_flight > capacity:
+                    time.sleep(latency * in_flight / capacity)
+                elif latency > 0:
+                    time.sleep(latency)
+            finally:
+                with lock:
+                    load["in_flight"] -= 1
+
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(data)))
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def read_body(self) -> bytes:
+            return self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+        def read_upload(self) -> bytes:
+            """Returns the file of a multipart/form-data body"""
+
+            body = self.read_body()
+            boundary = re.search(r"boundary=(.+)", self.headers["Content-Type"]).group(1)
+
+            for part in body.split(b"--" + boundary.encode()):
+                if b"filename=" in part:
+                    return part.split(b"\r\n\r\n", 1)[1][:-2]
+
+            return b""
+
+        def route(self):
+            url = urlparse(self.path)
+            return url.path.replace("/geonetwork/srv", "", 1), parse_qs(url.query)
+
+        def do_GET(self):
+
+            path, _ = self.route()
+            segments = path.strip("/").split("/")
+
+            if path == "/api/me":
+                self.send(200, {"id": 1, "username": "bench", "profile": "Administrator"})
+
+            elif path == "/api/users":
+                self.send(200, catalogue.users)
+
+            elif path == "/api/users/owners":
+                self.send(200, [{"id": user["id"]} for user in catalogue.users])
+
+            elif segments[:2] == ["api", "users"] and len(segments) == 3:
+                self.send(200, catalogue.users[int(segments[2]) - 1])
+
+            elif segments[:2] == ["api", "users"] and segments[-1] == "groups":
+                group = catalogue.groups[int(segments[2]) % (len(catalogue.groups) - 1)]
+                self.send(200, [{"group": {"name": group["name"]},
+                                    "id": {"profile": "Editor", "groupId": group["id"]}}])
+
+            elif path == "/api/groups":
+                self.send(200, catalogue.groups)
+
+            elif segments[:2] == ["api", "groups"] and segments[-1] == "users":
+                self.send(200, catalogue.users[:5])
+
+            elif segments[:2] == ["api", "records"] and segments[-2] == "formatters":
+
+                if segments[2] not in catalogue.by_uuid:
+                    self.send(404, {"message": "Metadata not found"})
+                elif segments[-1] == "zip":
+                    self.send(200, catalogue.get_mef(segments[2]), "application/x-gn-mef-2-zip")
+                else:
+                    self.send(200, catalogue.get_xml(segments[2]), "application/xml")
+
+            elif segments[:2] == ["api", "records"] and segments[-1] == "editor":
+                self.send(200, "<editor/>", "application/xml")
+
+            elif segments[:3] == ["api", "registries", "vocabularies"]:
+                self.send(200, "<rdf:RDF xmlns:rdf=\"http://www.w3.org/1999/02/22-rdf-syntax-ns#\"/>",
+                            "text/xml")
+
+            elif path.endswith("unpublish.report.csv"):
+                self.send(200, "uuid;date\n", "text/csv")
+
+            elif path.endswith("admin.harvester.list"):
+                self.send(200, [])
+
+            else:
+                self.send(404, {"message": f"Not served by the mock : {path}"})
+
+        def do_POST(self):
+
+            path, _ = self.route()
+
+            if path == "/eng/info":
+                self.read_body()
+                self.send(200, '<info><me authenticated="true"/></info>', "application/xml",
+                            headers={"Set-Cookie": "XSRF-TOKEN=benchmark-token; Path=/"})
+
+            elif path == "/api/search/records/_search":
+                self.send(200, catalogue.search(json.loads(self.read_body())))
+
+            elif path == "/api/records":
+
+                with zipfile.ZipFile(io.BytesIO(self.read_upload())) as archive:
+                    uuids = [name.split("/")[0] for name in archive.namelist()
+                                if name.endswith("/info.xml") and name.count("/") == 1]
+
+                self.send(201, get_process_report(uuids))
+
+            else:
+                self.read_body()
+                self.send(404, {"message": f"Not served by the mock : {path}"})
+
+        def process_bucket(self, query: dict):
+            """Returns the processing report of the records selected in the bucket of query"""
+
+            selected = selections.get(query.get("bucket", [None])[0], set())
+            found = sorted(uuid for uuid in selected if uuid in catalogue.by_uuid)
+            return get_process_report(found, not_found=len(selected) - len(found))
+
+        def do_PUT(self):
+
+            path, query = self.route()
+            segments = path.strip("/").split("/")
+            self.read_body()
+
+            if segments[:2] == ["api", "selections"]:
+                with lock:
+                    selection = selections.setdefault(segments[2], set())
+                    selection.update(query.get("uuid", []))
+                    count = len(selection)
+                self.send(201, count)
+            elif segments[-1] == "internal":
+                self.send(201, {})
+            elif path in ["/api/records/ownership", "/api/records/sharing",
+                            "/api/records/batchediting", "/api/records/validate"]:
+                self.send(201, self.process_bucket(query))
+            elif segments[-1] == "sharing":
+                self.send(204)
+            elif segments[-1] == "ownership":
+                self.send(201, get_process_report([segments[2]]))
+            else:
+                self.send(404, {"message": f"Not served by the mock : {path}"})
+
+        def do_DELETE(self):
+
+            path, query = self.route()
+            segments = path.strip("/").split("/")
+
+            if segments[:2] == ["api", "selections"]:
+                with lock:
+                    selection = selections.setdefault(segments[2], set())
+                    if "uuid" in query:
+                        selection.difference_update(query["uuid"])
+                    else:
+                        selection.clear()
+                self.send(204)
+            elif path == "/api/records":
+                self.send(200, self.process_bucket(query))
+            elif path.endswith("/editor"):
+                self.send(204)
+            else:
+                self.send(404, {"message": f"Not served by the mock : {path}"})
+
+    return MockGeonetworkHandler
+
+
+def serve(port: int = 0, latency: float = 0.0, capacity: int = None, ready=None, **catalogue):
+    """
+    Serves a synthetic catalogue until interrupted.
+
+    Parameters:
+        port (int): port to listen on, a free port if 0
+        latency (float): delay added to every response in seconds
+        capacity (int): number of requests in flight above which the server is overloaded
+        ready: if given, a multiprocessing queue receiving the port once listening
+        catalogue: parameters of MockCatalogue
+    """
+
+    server = ThreadingHTTPServer(("127.0.0.1", port),
+                                    make_handler(MockCatalogue(**catalogue), latency, capacity))
+    server.daemon_threads = True
+
+    if ready is not None:
+        ready.put(server.server_port)
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--records", type=int, default=5000)
+    parser.add_argument("--subtemplates", type=int, default=300)
+    parser.add_argument("--record-size", type=int, default=4096)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--capacity", type=int)
+    args = parser.parse_args()
+
+    print(f"Mock GeoNetwork listening on http://127.0.0.1:{args.port}")
+    serve(port=args.port, latency=args.latency, capacity=args.capacity, records=args.records,
+            subtemplates=args.subtemplates, record_size=args.record_size)
@@ -2,6 +2,7 @@ import argparse
 import os
 import colorama
 from geopycat.subtemplate.delete_unused_subtpl import DeleteUnusedSubtemplate
+from geopycat.concurrency import AdaptiveLimiter
 
 colorama.init()
 
@@ -12,6 +13,8 @@ parser.add_argument("-older-than", nargs= '?', type=int, const=3, default=3)
 parser.add_argument("--no-backup", action="store_false")
 parser.add_argument("-db-user")
 parser.add_argument("-db-password")
+parser.add_argument("--metrics")
+parser.add_argument("--adaptive", type=int)
 
 args = parser.parse_args()
 
@@ -23,4 +26,12 @@ if __name__ == "__main__":
     if args.db_password is not None:
         os.environ["DB_PASSWORD"] = args.db_password
 
-    DeleteUnusedSubtemplate(env=args.env, older_than=args.older_than, with_backup=args.no_backup)
\ No newline at end of file
+    limiter = None
+    if args.adaptive is not None:
+        limiter = AdaptiveLimiter(maximum=args.adaptive)
+
+    delete = DeleteUnusedSubtemplate(env=args.env, older_than=args.older_than, with_backup=args.no_backup,
+                                        limiter=limiter)
+
+    if args.metrics is not None:
+        delete.metrics.write(args.metrics)
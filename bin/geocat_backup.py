@@ -1,6 +1,7 @@
 import argparse
 import colorama
 from geopycat.GeocatBackup import GeocatBackup
+from geopycat.concurrency import AdaptiveLimiter
 
 colorama.init()
 
@@ -12,10 +13,22 @@ parser.add_argument("-m", "--metadata", action="store_false")
 parser.add_argument("-u", "--users", action="store_false")
 parser.add_argument("-g", "--groups", action="store_false")
 parser.add_argument("-s", "--subtpl", action="store_false")
+parser.add_argument("--metrics")
+parser.add_argument("--record")
+parser.add_argument("--replay")
+parser.add_argument("--adaptive", type=int)
 
 args = parser.parse_args()
 
 if __name__ == "__main__":
 
-    GeocatBackup(env=args.env, backup_dir=args.output_folder, catalogue=args.metadata,
-                    users=args.users, groups=args.groups, subtemplates=args.subtpl)
+    limiter = None
+    if args.adaptive is not None:
+        limiter = AdaptiveLimiter(maximum=args.adaptive)
+
+    backup = GeocatBackup(env=args.env, backup_dir=args.output_folder, catalogue=args.metadata,
+                             users=args.users, groups=args.groups, subtemplates=args.subtpl,
+                             record=args.record, replay=args.replay, limiter=limiter)
+
+    if args.metrics is not None:
+        backup.metrics.write(args.metrics)
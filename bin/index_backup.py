@@ -0,0 +1,17 @@
+import argparse
+import colorama
+from geopycat.GeocatBackup import build_backup_index
+
+colorama.init()
+
+parser = argparse.ArgumentParser()
+
+parser.add_argument("--backup-folder", nargs=1, type=str, required=True)
+parser.add_argument("-o", "--output")
+parser.add_argument("--workers", type=int)
+
+args = parser.parse_args()
+
+if __name__ == "__main__":
+
+    build_backup_index(backup_dir=args.backup_folder[0], db_path=args.output, workers=args.workers)
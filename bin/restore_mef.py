@@ -1,8 +1,10 @@
 import argparse
 import colorama
 import os
+import json
 from geopycat.GeocatBackup import Restore
 from geopycat import utils
+from geopycat.concurrency import AdaptiveLimiter
 
 colorama.init()
 
@@ -10,26 +12,38 @@ parser = argparse.ArgumentParser()
 
 parser.add_argument("-env", nargs= '?', const="int", default="int")
 parser.add_argument("--mef-folder", nargs=1, type=str, required=True)
+parser.add_argument("--workers", type=int, default=4)
+parser.add_argument("--report")
+parser.add_argument("--pack", action="store_true")
+parser.add_argument("--pack-size", type=int, default=100)
+parser.add_argument("--metrics")
+parser.add_argument("--adaptive", type=int)
 
 args = parser.parse_args()
 
 if __name__ == "__main__":
 
-    restore = Restore(env=args.env)
+    limiter = None
+    if args.adaptive is not None:
+        limiter = AdaptiveLimiter(initial=args.workers, maximum=args.adaptive)
 
-    mefs = [os.path.join(args.mef_folder[0], i) for i in os.listdir(args.mef_folder[0]) if i.endswith(".zip")]
+    restore = Restore(env=args.env, limiter=limiter)
 
-    count = 0
+    mefs = [os.path.join(args.mef_folder[0], i) for i in os.listdir(args.mef_folder[0]) if i.endswith(".zip")]
 
-    for mef in mefs:
+    report = restore.restore_metadata_from_mefs(mefs=mefs, workers=args.workers, pack=args.pack,
+                                                max_records=args.pack_size)
 
-        count += 1
+    for record in report:
 
-        try:
-            restore.restore_metadata_from_mef(mef=mef)
+        if record["success"]:
+            print(utils.okgreen(f"{record['mef']} - record restored successfully"))
+        else:
+            print(utils.warningred(f"{record['mef']} - unable to restore record : {record['error']}"))
 
-        except:
-            print(utils.warningred(f"[{round((count / len(mefs)) * 100, 1)}%] {mef} - unable to restore record"))
-            continue
+    if args.report is not None:
+        with open(args.report, "w") as file:
+            json.dump(report, file, indent=4)
 
-        print(utils.okgreen(f"[{round((count / len(mefs)) * 100, 1)}%] {mef} - record restored successfully"))
+    if args.metrics is not None:
+        restore.metrics.write(args.metrics)
@@ -3,7 +3,7 @@ import logging.config
 import argparse
 import colorama
 import geopycat
-from lxml import etree as ET
+from geopycat.concurrency import AdaptiveLimiter
 from datetime import datetime
 
 colorama.init()
@@ -13,55 +13,35 @@ parser = argparse.ArgumentParser()
 parser.add_argument("-env", nargs= '?', const="int", default="int")
 parser.add_argument("--in-groups", nargs="*", type=int)
 parser.add_argument("--not-in-groups", nargs="*", type=int)
+parser.add_argument("--from-db", action="store_true")
+parser.add_argument("--workers", type=int, default=4)
+parser.add_argument("--log")
+parser.add_argument("--metrics")
+parser.add_argument("--record")
+parser.add_argument("--replay")
+parser.add_argument("--adaptive", type=int)
 
 args = parser.parse_args()
 
 if __name__ == "__main__":
 
-    geocat = geopycat.geocat(env=args.env)
+    limiter = None
+    if args.adaptive is not None:
+        limiter = AdaptiveLimiter(initial=args.workers, maximum=args.adaptive)
+
+    geocat = geopycat.geocat(env=args.env, record=args.record, replay=args.replay,
+                                limiter=limiter)
     uuids = geocat.get_uuids(with_harvested=False, with_templates=True,
                 in_groups=args.in_groups, not_in_groups=args.not_in_groups)
 
-    log_config = geopycat.utils.get_log_config(f"Save&Close_{datetime.now().strftime('%Y%m%d-%H%M%S')}")
+    log_config = geopycat.utils.get_log_config()
     logging.config.dictConfig(log_config)
 
-    logger = logging.getLogger(__name__)
-
-    print("Save and close : ", end="\r")
-    count = 0
-
-    for uuid in uuids:
-
-        count += 1
-
-        md = geocat.get_metadata_from_mef(uuid)
-
-        if md is None:
-            print(geopycat.utils.warningred(f"{uuid} - unable to retrieve metadata"))
-            logger.error(f"{uuid} - unable to retrieve metadata")
-            continue
-
-        root = ET.fromstring(md)
-        try:
-            xml_uuid = root.find("gmd:fileIdentifier/gco:CharacterString", 
-                                    namespaces=geopycat.settings.NS).text
-        except:
-            print(geopycat.utils.warningred(f"{uuid} - unable to retrieve uuid"))
-            logger.error(f"{uuid} - unable to retrieve uuid")
-            continue
-
-        body = [{
-            "xpath": "/gmd:fileIdentifier/gco:CharacterString",
-            "value": f"<gn_replace>{geopycat.utils.xmlify(xml_uuid)}</gn_replace>"
-        }]
+    logfile = args.log
+    if logfile is None:
+        logfile = f"Save&Close_{datetime.now().strftime('%Y%m%d-%H%M%S')}"
 
-        response = geocat.edit_metadata(uuid=uuid, body=body, updateDateStamp=False)
-        if geopycat.utils.process_ok(response):
-            print(geopycat.utils.okgreen(f"{uuid} - successfully saved and closed"))
-            logger.info(f"{uuid} - successfully saved and closed")
-        else:
-            print(geopycat.utils.warningred(f"{uuid} - unsuccessfully saved and closed"))
-            logger.error(f"{uuid} - unsuccessfully saved and closed")
+    geocat.save_and_close(uuids=uuids, from_db=args.from_db, workers=args.workers, logfile=logfile)
 
-        print(f"Save and close : {round((count / len(uuids)) * 100, 1)}%", end="\r")
-    print(f"Save and close : {geopycat.utils.okgreen('Done')}")
\ No newline at end of file
+    if args.metrics is not None:
+        geocat.metrics.write(args.metrics)
@@ -0,0 +1,34 @@
+import argparse
+import colorama
+from geopycat.mirror import CatalogueMirror
+from geopycat.concurrency import AdaptiveLimiter
+
+colorama.init()
+
+parser = argparse.ArgumentParser()
+
+parser.add_argument("-env", nargs= '?', const="int", default="int")
+parser.add_argument("--mirror", nargs=1, type=str, required=True)
+parser.add_argument("--with-templates", action="store_true")
+parser.add_argument("--in-groups", nargs="*", type=int)
+parser.add_argument("--workers", type=int, default=4)
+parser.add_argument("--full", action="store_true")
+parser.add_argument("--adaptive", type=int)
+parser.add_argument("--metrics")
+
+args = parser.parse_args()
+
+if __name__ == "__main__":
+
+    limiter = None
+    if args.adaptive is not None:
+        limiter = AdaptiveLimiter(initial=args.workers, maximum=args.adaptive)
+
+    mirror = CatalogueMirror(path=args.mirror[0], with_templates=args.with_templates,
+                                in_groups=args.in_groups, env=args.env, limiter=limiter)
+
+    mirror.sync(workers=args.workers, full=args.full)
+    mirror.close()
+
+    if args.metrics is not None:
+        mirror.metrics.write(args.metrics)
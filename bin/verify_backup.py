@@ -0,0 +1,20 @@
+import argparse
+import sys
+import colorama
+from geopycat.GeocatBackup import verify_backup
+
+colorama.init()
+
+parser = argparse.ArgumentParser()
+
+parser.add_argument("--backup-folder", nargs=1, type=str, required=True)
+parser.add_argument("-o", "--output")
+parser.add_argument("--workers", type=int)
+
+args = parser.parse_args()
+
+if __name__ == "__main__":
+
+    report = verify_backup(backup_dir=args.backup_folder[0], output=args.output, workers=args.workers)
+
+    sys.exit(0 if report["valid"] else 1)
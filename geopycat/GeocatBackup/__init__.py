@@ -1,2 +1,5 @@
 from geopycat.GeocatBackup.backup_generator import GeocatBackup
-from geopycat.GeocatBackup.restore import Restore
\ No newline at end of file
+from geopycat.GeocatBackup.restore import Restore
+from geopycat.GeocatBackup.analysis import analyse_backup
+from geopycat.GeocatBackup.backup_index import build_backup_index, BackupIndex
+from geopycat.GeocatBackup.verify import verify_backup
\ No newline at end of file
@@ -0,0 +1,230 @@
+import os
+import re
+import csv
+import json
+import hashlib
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import pandas as pd
+from lxml import etree as ET
+from geopycat import settings
+from geopycat import utils
+
+
+COLUMNS = ["path", "kind", "uuid", "size", "is_template", "schema", "change_date", "root",
+            "group_owner", "owner", "language", "locales", "title", "error"]
+
+DETAIL_COLUMNS = ["checksum", "subtemplates"]
+
+SUBTEMPLATE_HREF = re.compile(r"(?:registries/entries/|[?&]uuid=)([^/?&#]+)")
+
+
+def list_backup_records(backup_dir: str) -> list:
+    """
+    Lists the records of a geocat backup (output of GeocatBackup) or of a folder
+    of MEF and XML files (output of backup_metadata and backup_metadata_xml).
+
+    Returns:
+        List of tuple (path, kind). kind is "metadata" for MEF files, "contact",
+        "extent" or "format" for subtemplates and "xml" for other XML files.
+    """
+
+    records = []
+
+    for root, dirs, files in os.walk(backup_dir):
+
+        dirs.sort()
+        kind = settings.BACKUP_SUBTEMPLATES_DIRS.get(os.path.basename(root), "xml")
+
+        for file in sorted(files):
+            if file.endswith(".zip"):
+                records.append((os.path.join(root, file), "metadata"))
+            elif file.endswith(".xml"):
+                records.append((os.path.join(root, file), kind))
+
+    return records
+
+
+def load_backup_manifest(backup_dir: str) -> dict:
+    """
+    Loads the manifest of the metadata written by GeocatBackup.
+
+    Returns:
+        Dict {uuid: {"uuid", "file", "groupOwner", "owner", "isTemplate"}},
+        empty if the backup has no manifest.
+    """
+
+    path = os.path.join(backup_dir, settings.BACKUP_MANIFEST)
+
+    if not os.path.isfile(path):
+        return {}
+
+    with open(path) as file:
+        return {record["uuid"]: record for record in json.load(file)}
+
+
+def read_backup_record(path: str, kind: str, details: bool = False) -> dict:
+    """
+    Parses a record of a backup (MEF or XML file) and extracts its main fields.
+    With details, the sha256 checksum of the file and the uuids of the referenced
+    subtemplates ("/" separated) are extracted as well.
+    Errors are reported in the "error" field instead of being raised.
+    """
+
+    record = dict.fromkeys(COLUMNS + DETAIL_COLUMNS if details else COLUMNS)
+    record["path"] = path
+    record["kind"] = kind
+
+    try:
+        record["size"] = os.path.getsize(path)
+
+        if details:
+            digest = hashlib.sha256()
+            with open(path, "rb") as file:
+                for block in iter(lambda: file.read(1 << 20), b""):
+                    digest.update(block)
+            record["checksum"] = digest.hexdigest()
+
+        if kind == "metadata":
+
+            with zipfile.ZipFile(path) as archive:
+                names = archive.namelist()
+                info = ET.fromstring(archive.read(
+                    next(n for n in names if n.endswith("/info.xml") and n.count("/") == 1)))
+                metadata = ET.fromstring(archive.read(
+                    next(n for n in names if n.endswith("/metadata/metadata.xml"))))
+
+            record["uuid"] = info.findtext("./general/uuid")
+            record["is_template"] = info.findtext("./general/isTemplate")
+            record["schema"] = info.findtext("./general/schema")
+            record["change_date"] = info.findtext("./general/changeDate")
+
+        else:
+            metadata = ET.parse(path).getroot()
+            record["uuid"] = os.path.splitext(os.path.basename(path))[0]
+
+        record["root"] = utils.xpath_ns_url2code(metadata.tag)
+
+        fields = utils.get_metadata_fields(metadata)
+
+        if kind == "xml" and fields["uuid"] is not None:
+            record["uuid"] = fields["uuid"]
+
+        record["language"] = fields["language"]
+        record["locales"] = "/".join(fields["locales"])
+        record["title"] = fields["title"]
+
+        if details:
+            hrefs = utils.get_xpath(".//@xlink:href")(metadata)
+            subtemplates = [m.group(1) for m in map(SUBTEMPLATE_HREF.search, hrefs) if m]
+            record["subtemplates"] = "/".join(dict.fromkeys(subtemplates))
+
+    except Exception as error:
+        record["error"] = f"{type(error).__name__}: {error}"
+
+    return record
+
+
+def _read_backup_records(records: list) -> list:
+    """Work unit of the process pool, parses a chunk of records"""
+    return [read_backup_record(path, kind) for path, kind in records]
+
+
+def _read_backup_records_details(records: list) -> list:
+    """Work unit of the process pool, parses a chunk of records with details"""
+    return [read_backup_record(path, kind, details=True) for path, kind in records]
+
+
+def map_backup_records(records: list, reader, workers: int = None, chunksize: int = 200):
+    """
+    Runs reader on chunks of records in a pool of processes.
+
+    Parameters:
+        records (list): list of (path, kind) (see list_backup_records)
+        reader: picklable function parsing a list of (path, kind) into a list of dict
+        workers (int): number of processes, by default the number of CPUs
+        chunksize (int): number of records per work unit
+
+    Yields:
+        One dict per record, as soon as its chunk is done (chunks in completion order)
+    """
+
+    chunks = [records[i:i + chunksize] for i in range(0, len(records), chunksize)]
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+
+        futures = [executor.submit(reader, chunk) for chunk in chunks]
+
+        try:
+            for future in as_completed(futures):
+                yield from future.result()
+        finally:
+            for future in futures:
+                future.cancel()
+
+
+def iter_backup_records(backup_dir: str, workers: int = None, chunksize: int = 200,
+                        reader=_read_backup_records):
+    """
+    Parses all records of a backup in a pool of processes.
+    Records are sent to the processes in chunks and yielded as soon as their chunk is done,
+    so not in the order of the backup.
+    Ownership is completed from the backup manifest.
+
+    Parameters:
+        backup_dir (str): path to the backup
+        workers (int): number of processes, by default the number of CPUs
+        chunksize (int): number of records per work unit
+        reader: picklable function parsing a list of (path, kind) into a list of dict
+
+    Yields:
+        One dict per record
+    """
+
+    manifest = load_backup_manifest(backup_dir)
+
+    for row in map_backup_records(records=list_backup_records(backup_dir), reader=reader,
+                                    workers=workers, chunksize=chunksize):
+        if row.get("uuid") in manifest:
+            row["group_owner"] = manifest[row["uuid"]]["groupOwner"]
+            row["owner"] = manifest[row["uuid"]]["owner"]
+        yield row
+
+
+def analyse_backup(backup_dir: str, output: str = None, workers: int = None,
+                    chunksize: int = 200) -> pd.DataFrame:
+    """
+    Extracts the main fields (uuid, type, languages, title, ownership...) of all records
+    of a backup using a pool of processes.
+
+    Parameters:
+        backup_dir (str): path to the backup
+        output (str): path to a csv file. If given, rows are streamed to the file as they
+        are parsed and nothing is returned.
+        workers (int): number of processes, by default the number of CPUs
+        chunksize (int): number of records per work unit
+
+    Returns:
+        A DataFrame with one row per record if output is None
+    """
+
+    rows = iter_backup_records(backup_dir=backup_dir, workers=workers, chunksize=chunksize)
+
+    if output is None:
+        return pd.DataFrame(list(rows), columns=COLUMNS)
+
+    count = 0
+    print("Analyse backup : ", end="\r")
+
+    with open(output, "w", newline="", encoding="utf-8") as file:
+        writer = csv.DictWriter(file, fieldnames=COLUMNS)
+        writer.writeheader()
+
+        for row in rows:
+            writer.writerow(row)
+            count += 1
+
+            if count % chunksize == 0:
+                print(f"Analyse backup : {count} records", end="\r")
+
+    print(f"Analyse backup : {utils.okgreen('Done')} ({count} records)")
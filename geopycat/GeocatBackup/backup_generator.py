@@ -1,10 +1,12 @@
 import os
 import json
+import copy
 import pandas as pd
 import xml.etree.ElementTree as ET
 from datetime import datetime
 from geopycat import geocat
 from geopycat import utils
+from geopycat import settings
 
 
 class GeocatBackup(geocat):
@@ -45,6 +47,8 @@ class GeocatBackup(geocat):
         self.__backup_harvesting_settings()
         self.__write_logfile()
 
+        self.metrics.write(os.path.join(self.backup_dir, "request_metrics.json"))
+
         print(utils.okgreen("Backup Done"))
 
     def __backup_metadata(self):
@@ -52,7 +56,25 @@ class GeocatBackup(geocat):
         if not os.path.isdir(os.path.join(self.backup_dir, "metadata")):
             os.mkdir(os.path.join(self.backup_dir, "metadata"))
 
-        uuids = self.get_uuids(with_harvested=False, with_templates=True)
+        body = copy.deepcopy(settings.SEARCH_UUID_API_BODY)
+        body["query"] = utils.get_search_query(with_harvested=False, with_templates=True)
+        body["_source"]["includes"] += ["groupOwner", "owner", "isTemplate"]
+
+        indexes = self.es_deep_search(body=body)
+        uuids = [i["_source"]["uuid"] for i in indexes]
+
+        # Save the list of expected records with their ownership
+        manifest = [{
+            "uuid": i["_source"]["uuid"],
+            "file": f"{utils.uuid_to_filename(i['_source']['uuid'])}.zip",
+            "groupOwner": i["_source"].get("groupOwner"),
+            "owner": i["_source"].get("owner"),
+            "isTemplate": i["_source"].get("isTemplate"),
+        } for i in indexes]
+
+        with open(os.path.join(self.backup_dir, settings.BACKUP_MANIFEST), "w") as file:
+            json.dump(manifest, file)
+
         self.backup_metadata(uuids=uuids, backup_dir=os.path.join(self.backup_dir, "metadata"), 
                                 with_related=False)
 
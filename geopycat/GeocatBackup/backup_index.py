@@ -0,0 +1,190 @@
+import os
+import sqlite3
+import pandas as pd
+from geopycat import utils
+from geopycat.GeocatBackup.analysis import iter_backup_records, _read_backup_records_details
+
+
+SCHEMA = """
+CREATE TABLE records (
+    path TEXT PRIMARY KEY,
+    kind TEXT,
+    uuid TEXT,
+    size INTEGER,
+    checksum TEXT,
+    is_template TEXT,
+    schema TEXT,
+    change_date TEXT,
+    root TEXT,
+    group_owner INTEGER,
+    owner INTEGER,
+    language TEXT,
+    locales TEXT,
+    title TEXT,
+    error TEXT
+);
+CREATE TABLE languages (uuid TEXT, language TEXT);
+CREATE TABLE subtemplates (uuid TEXT, subtemplate_uuid TEXT);
+CREATE INDEX records_uuid ON records (uuid);
+CREATE INDEX records_group_owner ON records (group_owner);
+CREATE INDEX records_change_date ON records (change_date);
+CREATE INDEX languages_language ON languages (language, uuid);
+CREATE INDEX subtemplates_subtemplate_uuid ON subtemplates (subtemplate_uuid, uuid);
+"""
+
+RECORD_COLUMNS = ["path", "kind", "uuid", "size", "checksum", "is_template", "schema",
+                    "change_date", "root", "group_owner", "owner", "language", "locales",
+                    "title", "error"]
+
+
+def build_backup_index(backup_dir: str, db_path: str = None, workers: int = None,
+                        chunksize: int = 200) -> str:
+    """
+    Builds a SQLite index of a backup in one parallel pass (see analysis.iter_backup_records).
+    For each record are stored the path (relative to the backup), size, sha256 checksum,
+    changeDate, ownership, schema, languages and referenced subtemplates.
+
+    Parameters:
+        backup_dir (str): path to the backup
+        db_path (str): path of the SQLite file, by default backup_index.sqlite in the backup
+        workers (int): number of processes, by default the number of CPUs
+        chunksize (int): number of records per work unit
+
+    Returns:
+        The path of the SQLite file
+    """
+
+    if db_path is None:
+        db_path = os.path.join(backup_dir, "backup_index.sqlite")
+
+    if os.path.isfile(db_path):
+        os.remove(db_path)
+
+    connection = sqlite3.connect(db_path)
+    connection.executescript(SCHEMA)
+
+    print("Index backup : ", end="\r")
+
+    count = 0
+    records, languages, subtemplates = [], [], []
+
+    def flush():
+        connection.executemany(f"INSERT INTO records VALUES ({','.join('?' * len(RECORD_COLUMNS))})",
+                                records)
+        connection.executemany("INSERT INTO languages VALUES (?, ?)", languages)
+        connection.executemany("INSERT INTO subtemplates VALUES (?, ?)", subtemplates)
+        connection.commit()
+        records.clear()
+        languages.clear()
+        subtemplates.clear()
+
+    try:
+        for row in iter_backup_records(backup_dir=backup_dir, workers=workers,
+                                        chunksize=chunksize, reader=_read_backup_records_details):
+
+            row["path"] = os.path.relpath(row["path"], backup_dir)
+
+            for key in ["group_owner", "owner"]:
+                if row[key] is not None:
+                    row[key] = int(row[key])
+
+            records.append([row[column] for column in RECORD_COLUMNS])
+
+            for language in [row["language"]] + (row["locales"] or "").split("/"):
+                if language:
+                    languages.append((row["uuid"], language))
+
+            for subtemplate in (row["subtemplates"] or "").split("/"):
+                if subtemplate:
+                    subtemplates.append((row["uuid"], subtemplate))
+
+            count += 1
+
+            if len(records) >= chunksize:
+                flush()
+                print(f"Index backup : {count} records", end="\r")
+
+        flush()
+
+    finally:
+        connection.close()
+
+    print(f"Index backup : {utils.okgreen('Done')} ({count} records)")
+
+    return db_path
+
+
+class BackupIndex():
+    """
+    Queries the SQLite index of a backup built by build_backup_index.
+
+    Parameters :
+        db_path (str): path of the SQLite file
+    """
+
+    def __init__(self, db_path: str):
+
+        if not os.path.isfile(db_path):
+            raise Exception(f"No backup index : {db_path}")
+
+        self.connection = sqlite3.connect(db_path)
+
+    def sql(self, query: str, params: tuple = ()) -> pd.DataFrame:
+        """Runs a SQL query on the index and returns the result as DataFrame"""
+
+        return pd.read_sql_query(query, self.connection, params=params)
+
+    def find(self, uuid: str) -> pd.DataFrame:
+        """Returns the records of the backup with the given uuid"""
+
+        return self.sql("SELECT * FROM records WHERE uuid = ?", (uuid,))
+
+    def query(self, group_owner: int = None, kind: str = None, language: str = None,
+                changed_after: str = None, changed_before: str = None,
+                subtemplate: str = None) -> pd.DataFrame:
+        """
+        Returns the records of the backup matching all given parameters.
+
+        Parameters:
+            group_owner (int): group owner ID
+            kind (str): "metadata", "contact", "extent", "format" or "xml"
+            language (str): main or additional language (e.g. "ger")
+            changed_after (str): ISO date, records changed at or after this date
+            changed_before (str): ISO date, records changed before this date
+            subtemplate (str): uuid of a subtemplate referenced by the records
+        """
+
+        conditions, params = [], []
+
+        if group_owner is not None:
+            conditions.append("group_owner = ?")
+            params.append(group_owner)
+
+        if kind is not None:
+            conditions.append("kind = ?")
+            params.append(kind)
+
+        if language is not None:
+            conditions.append("uuid IN (SELECT uuid FROM languages WHERE language = ?)")
+            params.append(language)
+
+        if changed_after is not None:
+            conditions.append("change_date >= ?")
+            params.append(changed_after)
+
+        if changed_before is not None:
+            conditions.append("change_date < ?")
+            params.append(changed_before)
+
+        if subtemplate is not None:
+            conditions.append("uuid IN (SELECT uuid FROM subtemplates WHERE subtemplate_uuid = ?)")
+            params.append(subtemplate)
+
+        query = "SELECT * FROM records"
+        if len(conditions) > 0:
+            query += " WHERE " + " AND ".join(conditions)
+
+        return self.sql(query, tuple(params))
+
+    def close(self):
+        self.connection.close()
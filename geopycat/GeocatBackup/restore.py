@@ -1,7 +1,11 @@
 import zipfile
 import os
+import io
 from lxml import etree as ET
 import geopycat
+from geopycat import settings
+from geopycat.concurrency import run_parallel
+from geopycat.tracing import span, traced
 
 
 class Restore(geopycat.geocat):
@@ -27,6 +31,8 @@ class Restore(geopycat.geocat):
         else:
             raise Exception("Could not fetch groups information")
 
+        self.groups_by_name = {group["name"]: group["id"] for group in self.groups}
+
     def __get_permissions(self, xml: bytes) -> dict:
         """
         Fetches permissions from info.xml file inside MEF.
@@ -44,13 +50,11 @@ class Restore(geopycat.geocat):
         for group in xml_root.findall("./privileges/group"):
 
             # Get group ID from group name
-            i = [i for i in self.groups if i["name"] == group.attrib["name"]]
-
-            if len(i) != 1:
+            if group.attrib["name"] not in self.groups_by_name:
                 raise Exception("Could not fetch group ID from group name")
-            
+
             permissions["privileges"].append({
-                "group": i[0]["id"],
+                "group": self.groups_by_name[group.attrib["name"]],
                 "operations": {
                     "view": False,
                     "download": False,
@@ -66,55 +70,273 @@ class Restore(geopycat.geocat):
 
         return permissions
 
-    def restore_metadata_from_mef(self, mef: str):
+    @staticmethod
+    def __read_mef_info(mef: str) -> tuple:
         """
-        Restore a metadata from its MEF file.
-        UUID, permissions are taken from MEF.
-        Ownership is taken from existing record.
-        An internal validation process is performed on the restored record.
+        Reads the info.xml file inside MEF.
+        Args:
+            mef : path to the MEF file
+
+        Returns:
+            Tuple (uuid, info.xml as bytes)
         """
 
-        # Get info.xml from MEF
         filename = os.path.splitext(os.path.basename(mef))[0]
-        archive = zipfile.ZipFile(mef, 'r')
-        xml = archive.read(f'{filename}/info.xml')
+        with zipfile.ZipFile(mef, 'r') as archive:
+            xml = archive.read(f'{filename}/info.xml')
 
-        # Get UUID from MEF
         xml_root = ET.fromstring(xml)
         uuid = xml_root.find("./general/uuid").text
 
-        # Get ownership
-        ownership = self.get_metadata_ownership(uuid=uuid)
+        return uuid, xml
+
+    def __upload_mef(self, file, filename: str, group_id: int) -> object:
+        """
+        Uploads a MEF (single or multi records) with uuid overwriting.
+        Args:
+            file : file object or bytes of the MEF
+            filename : name of the uploaded file
+            group_id : group owner ID of the imported records
+
+        Returns:
+            The response of the request
+        """
+
+        self.clear_search_cache()
 
-        # Upload MEF
         headers = {"accept": "application/json"}
 
         params = {
             "metadataType": "METADATA",
             "uuidProcessing": "OVERWRITE",
-            "group": ownership["group_ID"],
+            "group": group_id,
             "transformWith": "_none_"
         }
 
+        return self.session.post(url=self.env + "/geonetwork/srv/api/records",
+                params=params, headers=headers, files={"file": (filename, file)})
+
+    def __finish_restore(self, uuid: str, xml: bytes, ownership: dict):
+        """
+        Validates an uploaded record and sets its permissions and ownership back.
+        Args:
+            uuid : metadata's UUID
+            xml : the info.xml file from MEF as bytes
+            ownership : {"owner_ID": int, "group_ID": int}
+        """
+
+        with span(self.tracer, "restore.finish", uuid=uuid):
+
+            # Validate metadata
+            self.validate_metadata(uuid=uuid)
+
+            # set permissions (handles publication status as well)
+            permission = self.__get_permissions(xml=xml)
+            res = self.set_metadata_permission(uuid=uuid, permission=permission)
+
+            if res.status_code != 204:
+                raise Exception("Could not set metadata permission back")
+
+            # set ownership
+            res = self.set_metadata_ownership(uuid=uuid, group_id=ownership["group_ID"],
+                                                user_id=ownership["owner_ID"])
+            if not geopycat.utils.process_ok(res):
+                raise Exception("Could not set metadata ownership back")
+
+    @traced("restore_metadata_from_mef", ("mef",))
+    def restore_metadata_from_mef(self, mef: str, ownership: dict = None):
+        """
+        Restore a metadata from its MEF file.
+        UUID, permissions are taken from MEF.
+        Ownership is taken from existing record.
+        An internal validation process is performed on the restored record.
+
+        Parameters:
+            mef (str): path to the MEF file
+            ownership (dict): {"owner_ID": int, "group_ID": int}, if None it is
+            fetched from the existing record
+        """
+
+        # Get UUID and info.xml from MEF
+        uuid, xml = self.__read_mef_info(mef)
+
+        # Get ownership
+        if ownership is None:
+            ownership = self.get_metadata_ownership(uuid=uuid)
+
+        # Upload MEF
         with open(mef, 'rb') as fileobj:
-            res = self.session.post(url=self.env + "/geonetwork/srv/api/records",
-                params=params, headers=headers, files={"file": (os.path.basename(mef), fileobj)})
+            res = self.__upload_mef(file=fileobj, filename=os.path.basename(mef),
+                                    group_id=ownership["group_ID"])
 
         if not geopycat.utils.process_ok(res):
             raise Exception("Could not upload metadata")
-        
-        # Validate metadata
-        self.validate_metadata(uuid=uuid)
-
-        # set permissions (handles publication status as well)
-        permission = self.__get_permissions(xml=xml)
-        res = self.set_metadata_permission(uuid=uuid, permission=permission)
-
-        if res.status_code != 204:
-            raise Exception("Could not set metadata permission back")
-        
-        # set ownership
-        res = self.set_metadata_ownership(uuid=uuid, group_id=ownership["group_ID"], 
-                                            user_id=ownership["owner_ID"])
-        if not geopycat.utils.process_ok(res):
-            raise Exception("Could not set metadata ownership back")
+
+        self.__finish_restore(uuid=uuid, xml=xml, ownership=ownership)
+
+    @staticmethod
+    def pack_mefs(mefs: list, max_records: int = settings.MEF_PACK_MAX_RECORDS,
+                    max_bytes: int = settings.MEF_PACK_MAX_BYTES):
+        """
+        Packs several single record MEF files into multi records MEF2 archives.
+        A pack is closed as soon as it reaches max_records or max_bytes (computed
+        on the size of the MEF files). A MEF bigger than max_bytes gets its own pack.
+
+        Parameters:
+            mefs (list): paths to the MEF files
+            max_records (int): maximum number of records per pack
+            max_bytes (int): maximum size of the MEF files per pack
+
+        Yields:
+            Tuple (pack as bytes, list of packed MEF paths)
+        """
+
+        def build(packed):
+            buffer = io.BytesIO()
+            with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as pack:
+                for mef in packed:
+                    with zipfile.ZipFile(mef, 'r') as archive:
+                        for info in archive.infolist():
+                            pack.writestr(info, archive.read(info))
+            return buffer.getvalue()
+
+        packed = []
+        size = 0
+
+        for mef in mefs:
+
+            mef_size = os.path.getsize(mef)
+
+            if len(packed) > 0 and (len(packed) >= max_records or size + mef_size > max_bytes):
+                yield build(packed), packed
+                packed = []
+                size = 0
+
+            packed.append(mef)
+            size += mef_size
+
+        if len(packed) > 0:
+            yield build(packed), packed
+
+    @traced("restore_metadata_from_mefs", ("mefs", "workers", "pack"))
+    def restore_metadata_from_mefs(self, mefs: list, workers: int = 4, pack: bool = False,
+                                    max_records: int = settings.MEF_PACK_MAX_RECORDS,
+                                    max_bytes: int = settings.MEF_PACK_MAX_BYTES) -> list:
+        """
+        Restore a list of metadata from their MEF files.
+        Ownership of all records is fetched in one batch before restoring, then each
+        record is restored (upload, validation, permissions, ownership) across a pool
+        of workers.
+
+        With pack, records are uploaded in multi records MEF2 archives (one per group
+        owner, sized by max_records and max_bytes) and the import report is split
+        back per uuid. Validation, permissions and ownership are then restored per record.
+
+        Parameters:
+            mefs (list): paths to the MEF files
+            workers (int): number of records (or packs) restored in parallel
+            pack (bool): upload records in multi records MEF2 archives
+            max_records (int): maximum number of records per pack
+            max_bytes (int): maximum size of the MEF files per pack
+
+        Returns:
+            List of dict, one per MEF in the order of mefs :
+            {"mef": str, "uuid": str, "success": bool, "error": str}
+        """
+
+        report = {mef: {"mef": mef, "uuid": None, "success": False, "error": None} for mef in mefs}
+        infos = {}
+
+        # Get UUID and info.xml from MEFs
+        for mef in mefs:
+            try:
+                report[mef]["uuid"], infos[mef] = self.__read_mef_info(mef)
+            except Exception as error:
+                report[mef]["error"] = f"Could not read info.xml from MEF : {error}"
+
+        # Get ownership of all records
+        todo = [mef for mef in mefs if report[mef]["uuid"] is not None]
+        ownerships = self.get_metadata_ownerships(uuids=[report[mef]["uuid"] for mef in todo])
+
+        for mef in todo:
+            if report[mef]["uuid"] not in ownerships:
+                report[mef]["error"] = "Could not retrieve ownership from existing record"
+
+        todo = [mef for mef in todo if report[mef]["error"] is None]
+
+        if pack:
+            todo = self.__upload_mef_packs(mefs=todo, report=report, ownerships=ownerships,
+                                workers=workers, max_records=max_records, max_bytes=max_bytes)
+
+            def restore(mef):
+                uuid = report[mef]["uuid"]
+                self.__finish_restore(uuid=uuid, xml=infos[mef], ownership=ownerships[uuid])
+
+        else:
+
+            def restore(mef):
+                self.restore_metadata_from_mef(mef=mef, ownership=ownerships[report[mef]["uuid"]])
+
+        count = 0
+        for mef, _, error in run_parallel(restore, todo, workers=workers,
+                                            limiter=self.limiter):
+
+            count += 1
+
+            if error is None:
+                report[mef]["success"] = True
+            else:
+                report[mef]["error"] = str(error)
+
+            print(f"Restore metadata : {round((count / len(todo)) * 100, 1)}%", end="\r")
+
+        print(f"Restore metadata : {geopycat.utils.okgreen('Done')}")
+
+        return list(report.values())
+
+    def __upload_mef_packs(self, mefs: list, report: dict, ownerships: dict, workers: int,
+                            max_records: int, max_bytes: int) -> list:
+        """
+        Uploads MEF files in multi records MEF2 archives, one set of packs per group owner.
+        Failures are written in the report.
+
+        Returns:
+            List of MEF paths successfully uploaded
+        """
+
+        by_group = {}
+        for mef in mefs:
+            by_group.setdefault(ownerships[report[mef]["uuid"]]["group_ID"], []).append(mef)
+
+        def packs():
+            for group_id, group_mefs in by_group.items():
+                for data, packed in self.pack_mefs(mefs=group_mefs, max_records=max_records,
+                                                    max_bytes=max_bytes):
+                    yield group_id, data, packed
+
+        def upload(item):
+            group_id, data, packed = item
+            res = self.__upload_mef(file=data, filename="pack.zip", group_id=group_id)
+            return geopycat.utils.get_process_report(res, [report[mef]["uuid"] for mef in packed])
+
+        uploaded = set()
+        count = 0
+        for item, outcomes, error in run_parallel(upload, packs(), workers=workers,
+                                                        limiter=self.limiter):
+
+            for mef in item[2]:
+
+                if error is not None:
+                    report[mef]["error"] = f"Could not upload metadata : {error}"
+                elif not outcomes[report[mef]["uuid"]]["success"]:
+                    report[mef]["error"] = f"Could not upload metadata : " \
+                        f"{outcomes[report[mef]['uuid']]['message']}"
+                else:
+                    uploaded.add(mef)
+
+            count += len(item[2])
+            print(f"Upload metadata : {round((count / len(mefs)) * 100, 1)}%", end="\r")
+
+        print(f"Upload metadata : {geopycat.utils.okgreen('Done')}")
+
+        return [mef for mef in mefs if mef in uploaded]
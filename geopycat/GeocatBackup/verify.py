@@ -0,0 +1,189 @@
+import os
+import json
+import zipfile
+from datetime import datetime
+from lxml import etree as ET
+from geopycat import utils
+from geopycat.GeocatBackup.analysis import list_backup_records, load_backup_manifest, \
+    map_backup_records
+
+
+# Entries of backup.log and the folder holding the counted files
+LOG_FOLDERS = {
+    "Metadatas backup": "metadata",
+    "Contacts (reusable objects) backup": "Subtemplates_contacts",
+    "Extents (reusable objects) backup": "Subtemplates_extents",
+    "Formats (reusable objects) backup": "Subtemplates_formats",
+}
+
+# Entries of backup.log and the json file holding the counted list
+LOG_FILES = {
+    "Users backup": os.path.join("users", "users.json"),
+    "Groups backup": os.path.join("groups", "groups.json"),
+}
+
+
+def verify_backup_file(path: str, kind: str) -> dict:
+    """
+    Checks that a file of a backup is complete and readable.
+    For MEF files, checks the CRC of every zip member and that metadata.xml and
+    info.xml parse. For XML files, checks that the file parses.
+
+    Returns:
+        dict {"path": str, "kind": str, "uuid": str, "ok": bool, "error": str}
+    """
+
+    result = {"path": path, "kind": kind, "uuid": None, "ok": False, "error": None}
+
+    try:
+        if kind == "metadata":
+
+            with zipfile.ZipFile(path) as archive:
+
+                corrupted = archive.testzip()
+                if corrupted is not None:
+                    raise Exception(f"Bad CRC for {corrupted}")
+
+                names = archive.namelist()
+                info = [n for n in names if n.endswith("/info.xml") and n.count("/") == 1]
+                metadata = [n for n in names if n.endswith("/metadata/metadata.xml")]
+
+                if len(info) == 0 or len(metadata) == 0:
+                    raise Exception("info.xml or metadata.xml missing")
+
+                result["uuid"] = ET.fromstring(archive.read(info[0])).findtext("./general/uuid")
+                ET.fromstring(archive.read(metadata[0]))
+
+        else:
+            ET.parse(path)
+            result["uuid"] = os.path.splitext(os.path.basename(path))[0]
+
+    except Exception as error:
+        result["error"] = f"{type(error).__name__}: {error}"
+
+    else:
+        result["ok"] = True
+
+    return result
+
+
+def _verify_backup_files(records: list) -> list:
+    """Work unit of the process pool, verifies a chunk of files"""
+    return [verify_backup_file(path, kind) for path, kind in records]
+
+
+def read_backup_log(backup_dir: str) -> dict:
+    """
+    Reads the counts written in backup.log by GeocatBackup.
+
+    Returns:
+        Dict {entry: count}, empty if the backup has no log
+    """
+
+    counts = {}
+    path = os.path.join(backup_dir, "backup.log")
+
+    if not os.path.isfile(path):
+        return counts
+
+    with open(path) as file:
+        for line in file:
+            if " : " in line:
+                entry, count = line.rsplit(" : ", 1)
+                if count.strip().isdigit():
+                    counts[entry.strip()] = int(count)
+
+    return counts
+
+
+def verify_backup(backup_dir: str, output: str = None, workers: int = None,
+                    chunksize: int = 200) -> dict:
+    """
+    Verifies the integrity of a backup generated by GeocatBackup.
+    All files are checked in a pool of processes (see verify_backup_file), then the
+    metadata files are compared with the manifest and the counts with backup.log.
+
+    Parameters:
+        backup_dir (str): path to the backup
+        output (str): path to a json file where the report is written
+        workers (int): number of processes, by default the number of CPUs
+        chunksize (int): number of files per work unit
+
+    Returns:
+        The report as dict, report["valid"] is True if no problem was found
+    """
+
+    report = {
+        "backup_dir": os.path.abspath(backup_dir),
+        "date": datetime.now().isoformat(timespec="seconds"),
+        "valid": True,
+        "files": 0,
+        "corrupted": [],
+        "manifest": None,
+        "log": {},
+    }
+
+    print("Verify backup : ", end="\r")
+
+    records = list_backup_records(backup_dir)
+    metadata_files = set()
+
+    for result in map_backup_records(records=records, reader=_verify_backup_files,
+                                        workers=workers, chunksize=chunksize):
+
+        report["files"] += 1
+
+        if result["kind"] == "metadata":
+            metadata_files.add(os.path.basename(result["path"]))
+
+        if not result["ok"]:
+            report["corrupted"].append({"path": result["path"], "error": result["error"]})
+
+        if report["files"] % chunksize == 0:
+            print(f"Verify backup : {round((report['files'] / len(records)) * 100, 1)}%", end="\r")
+
+    # Compare with the manifest
+    manifest = load_backup_manifest(backup_dir)
+
+    if len(manifest) > 0:
+        expected = {record["file"]: uuid for uuid, record in manifest.items()}
+        report["manifest"] = {
+            "expected": len(expected),
+            "missing": sorted(uuid for file, uuid in expected.items() if file not in metadata_files),
+            "unexpected": sorted(file for file in metadata_files if file not in expected),
+        }
+
+    # Compare with the counts of backup.log
+    for entry, count in read_backup_log(backup_dir).items():
+
+        if entry in LOG_FOLDERS:
+            folder = os.path.join(backup_dir, LOG_FOLDERS[entry])
+            found = len(os.listdir(folder)) if os.path.isdir(folder) else 0
+
+        elif entry in LOG_FILES:
+            try:
+                with open(os.path.join(backup_dir, LOG_FILES[entry])) as file:
+                    found = len(json.load(file))
+            except (OSError, ValueError):
+                found = 0
+
+        else:
+            continue
+
+        report["log"][entry] = {"logged": count, "found": found, "ok": count == found}
+
+    report["valid"] = len(report["corrupted"]) == 0 \
+        and (report["manifest"] is None or len(report["manifest"]["missing"]) == 0) \
+        and all(entry["ok"] for entry in report["log"].values())
+
+    if output is not None:
+        with open(output, "w") as file:
+            json.dump(report, file, indent=4)
+
+    if report["valid"]:
+        print(f"Verify backup : {utils.okgreen('Done')} ({report['files']} files)")
+    else:
+        print(f"Verify backup : {utils.warningred('Problems found')} ({report['files']} files, "
+                f"{len(report['corrupted'])} corrupted)")
+
+    return report
@@ -0,0 +1,152 @@
+import os
+import json
+import time
+import hashlib
+import functools
+import threading
+from collections import OrderedDict
+
+
+class SearchCache():
+    """
+    Cache of search results keyed by the canonicalized request body and the auth mode.
+    Entries expire after ttl seconds. When the size of the cache exceeds max_bytes,
+    the least recently used entries are evicted.
+
+    Parameters :
+        ttl (int): time to live of an entry in seconds
+        max_bytes (int): maximum size of the cache (in memory or on disk)
+        cache_dir (str): if given, entries are stored as files in this directory
+        instead of memory
+    """
+
+    def __init__(self, ttl: int = 600, max_bytes: int = 256 * 1024 * 1024, cache_dir: str = None):
+
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.cache_dir = cache_dir
+
+        self.__entries = OrderedDict()
+        self.__size = 0
+        self.__lock = threading.Lock()
+
+        if cache_dir is not None and not os.path.isdir(cache_dir):
+            os.makedirs(cache_dir)
+
+    @staticmethod
+    def get_key(body: dict, auth: str = None) -> str:
+        """Returns the cache key of a request body for the given auth mode (e.g. username)"""
+
+        canonical = json.dumps(body, sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(f"{auth}|{canonical}".encode("utf-8")).hexdigest()
+
+    def get(self, key: str):
+        """Returns the cached value of key, None if not cached or expired"""
+
+        with self.__lock:
+
+            if self.cache_dir is not None:
+                return self.__get_file(key)
+
+            if key not in self.__entries:
+                return None
+
+            created, data = self.__entries[key]
+
+            if time.time() - created > self.ttl:
+                self.__size -= len(data)
+                del self.__entries[key]
+                return None
+
+            self.__entries.move_to_end(key)
+
+        return json.loads(data)
+
+    def set(self, key: str, value):
+        """Caches a json serializable value under key"""
+
+        data = json.dumps(value, separators=(",", ":"))
+
+        if len(data) > self.max_bytes:
+            return
+
+        with self.__lock:
+
+            if self.cache_dir is not None:
+                self.__set_file(key, data)
+                return
+
+            if key in self.__entries:
+                self.__size -= len(self.__entries.pop(key)[1])
+
+            self.__entries[key] = (time.time(), data)
+            self.__size += len(data)
+
+            while self.__size > self.max_bytes:
+                self.__size -= len(self.__entries.popitem(last=False)[1][1])
+
+    def clear(self):
+        """Removes all entries"""
+
+        with self.__lock:
+
+            self.__entries.clear()
+            self.__size = 0
+
+            if self.cache_dir is not None:
+                for file in os.listdir(self.cache_dir):
+                    if file.endswith(".json"):
+                        os.remove(os.path.join(self.cache_dir, file))
+
+    def __get_file(self, key: str):
+
+        path = os.path.join(self.cache_dir, f"{key}.json")
+
+        if not os.path.isfile(path):
+            return None
+
+        if time.time() - os.path.getmtime(path) > self.ttl:
+            os.remove(path)
+            return None
+
+        # Update access time for the LRU eviction
+        os.utime(path, (time.time(), os.path.getmtime(path)))
+
+        with open(path, encoding="utf-8") as file:
+            return json.load(file)
+
+    def __set_file(self, key: str, data: str):
+
+        with open(os.path.join(self.cache_dir, f"{key}.json"), "w", encoding="utf-8") as file:
+            file.write(data)
+
+        files = [os.path.join(self.cache_dir, f) for f in os.listdir(self.cache_dir)
+                    if f.endswith(".json")]
+        stats = {f: os.stat(f) for f in files}
+        size = sum(stat.st_size for stat in stats.values())
+
+        for file in sorted(files, key=lambda f: stats[f].st_atime):
+            if size <= self.max_bytes:
+                break
+            size -= stats[file].st_size
+            os.remove(file)
+
+
+def clears_search_cache(method):
+    """
+    Decorator clearing the search cache of GeocatAPI before and after a method
+    modifying records. Clearing after the change drops results cached by a search
+    running concurrently with it.
+    """
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+
+        self.clear_search_cache()
+
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            self.clear_search_cache()
+
+    return wrapper
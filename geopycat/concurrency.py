@@ -0,0 +1,204 @@
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from geopycat.metrics import get_endpoint_template
+
+
+# HTTP status codes telling that the server is overloaded
+CONGESTION_STATUS_CODES = [429, 502, 503, 504]
+
+# HTTP status codes of requests rejected before being processed, safe to send again
+RETRY_STATUS_CODES = [429, 503]
+
+
+class AdaptiveLimiter():
+    """
+    AIMD (additive increase, multiplicative decrease) limiter of the number of requests
+    in flight. Give an instance to GeocatAPI (limiter parameter) to share it between the
+    session and all bulk operations, the number of threads of the bulk operations is
+    then raised to maximum and the limiter decides how many requests are sent at once.
+
+    The limit grows by one after a window of limit successful requests, and is multiplied
+    by decrease on a congestion signal : an error (exception, HTTP 429, 502, 503, 504),
+    a smoothed latency above latency_target or above tolerance times the lowest smoothed
+    latency observed. Latencies are smoothed per endpoint (method and template, see
+    metrics.get_endpoint_template), so that slow endpoints don't look like a congestion
+    of fast ones. The limit decreases at most once per window, so that a burst of
+    errors from requests sent at the same time counts once.
+
+    Requests rejected by the server (HTTP 429, 503) are sent again up to retries times,
+    after waiting backoff seconds times the attempt number.
+
+    Parameters:
+        initial (int): initial limit
+        minimum (int): lowest limit
+        maximum (int): highest limit
+        latency_target (float): latency in seconds above which the server is congested
+        tolerance (float): factor of the lowest latency above which the server is congested
+        decrease (float): factor applied to the limit on congestion
+        retries (int): number of times a rejected request is sent again
+        backoff (float): base waiting time in seconds before sending a rejected request again
+    """
+
+    SMOOTHING = 0.2
+    BASELINE_DRIFT = 0.01
+
+    def __init__(self, initial: int = 4, minimum: int = 1, maximum: int = 16,
+                    latency_target: float = None, tolerance: float = 3.0, decrease: float = 0.5,
+                    retries: int = 3, backoff: float = 1.0):
+
+        self.minimum = max(1, minimum)
+        self.maximum = max(self.minimum, maximum)
+        self.latency_target = latency_target
+        self.tolerance = tolerance
+        self.decrease = decrease
+        self.retries = retries
+        self.backoff = backoff
+
+        self.__limit = min(self.maximum, max(self.minimum, initial))
+        self.__in_flight = 0
+        self.__successes = 0
+        self.__since_decrease = 0
+        self.__latencies = {}
+        self.__condition = threading.Condition()
+
+    @property
+    def limit(self) -> int:
+        """Current number of requests allowed in flight"""
+        return self.__limit
+
+    @property
+    def in_flight(self) -> int:
+        """Number of requests in flight"""
+        return self.__in_flight
+
+    def acquire(self):
+        """Waits until a request can be sent"""
+
+        with self.__condition:
+            while self.__in_flight >= self.__limit:
+                self.__condition.wait()
+            self.__in_flight += 1
+
+    def release(self):
+        """Releases the slot of a finished request"""
+
+        with self.__condition:
+            self.__in_flight -= 1
+            self.__condition.notify_all()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.release()
+        return False
+
+    def record(self, latency: float, error: bool = False, method: str = None, url: str = None):
+        """
+        Records the outcome of a request and adapts the limit
+
+        Parameters:
+            latency (float): latency of the request in seconds
+            error (bool): True if the request failed or was rejected by the server
+            method (str): HTTP method of the request
+            url (str): url of the request, latencies are smoothed per endpoint
+        """
+
+        key = (method.upper() if method is not None else None,
+                get_endpoint_template(url) if url is not None else None)
+
+        with self.__condition:
+
+            if key not in self.__latencies:
+                self.__latencies[key] = {"latency": latency, "baseline": latency}
+
+            endpoint = self.__latencies[key]
+
+            endpoint["latency"] += self.SMOOTHING * (latency - endpoint["latency"])
+            # The baseline slowly follows the latency so that a durably slower server
+            # doesn't keep the limit at its minimum
+            endpoint["baseline"] = min(endpoint["latency"], endpoint["baseline"] +
+                                    self.BASELINE_DRIFT * (endpoint["latency"] - endpoint["baseline"]))
+
+            congested = error or endpoint["latency"] > endpoint["baseline"] * self.tolerance or \
+                (self.latency_target is not None and endpoint["latency"] > self.latency_target)
+
+            self.__since_decrease += 1
+
+            if congested:
+
+                self.__successes = 0
+
+                if self.__since_decrease >= self.__limit:
+                    self.__limit = max(self.minimum, int(self.__limit * self.decrease))
+                    self.__since_decrease = 0
+
+            else:
+
+                self.__successes += 1
+
+                if self.__successes >= self.__limit:
+                    self.__limit = min(self.maximum, self.__limit + 1)
+                    self.__successes = 0
+                    self.__condition.notify_all()
+
+
+def run_parallel(func, items, workers: int = 4, limiter: AdaptiveLimiter = None):
+    """
+    Runs func on every item across a pool of threads.
+    Items are submitted lazily (at most twice the number of workers in flight), so
+    items can be a generator producing large objects.
+    Yields the results as soon as they are available, not in the order of items.
+    The context (contextvars) of the caller is propagated to the threads, so spans
+    opened by func are children of the caller's span.
+
+    Parameters:
+        func: callable taking a single item as argument
+        items (iterable): items to process
+        workers (int): number of threads
+        limiter (AdaptiveLimiter): if given, the number of threads is raised to the
+        maximum of the limiter, which then controls the requests in flight
+
+    Yields:
+        Tuple (item, result, error). error is None if func succeeded, otherwise the
+        exception raised and result is None.
+    """
+
+    if limiter is not None:
+        workers = max(workers, limiter.maximum)
+
+    workers = max(1, workers)
+    items = iter(items)
+
+    def submit(executor, item):
+        return executor.submit(contextvars.copy_context().run, func, item)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+
+        futures = {}
+
+        for item in items:
+            futures[submit(executor, item)] = item
+            if len(futures) >= workers * 2:
+                break
+
+        while futures:
+
+            done, _ = wait(futures, return_when=FIRST_COMPLETED)
+
+            for future in done:
+
+                item = futures.pop(future)
+
+                try:
+                    result = future.result()
+                except Exception as error:
+                    yield item, None, error
+                else:
+                    yield item, result, None
+
+                for new_item in items:
+                    futures[submit(executor, new_item)] = new_item
+                    break
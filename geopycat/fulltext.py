@@ -0,0 +1,273 @@
+import os
+import sqlite3
+import zipfile
+from lxml import etree as ET
+from geopycat import utils
+from geopycat.GeocatBackup.analysis import list_backup_records, map_backup_records
+
+
+SCHEMA = """
+CREATE VIRTUAL TABLE records USING fts5(
+    uuid UNINDEXED,
+    kind UNINDEXED,
+    path UNINDEXED,
+    text,
+    tokenize = 'trigram'
+);
+"""
+
+# Kind of the subtemplates of a mirror by root element, as the folders of a backup
+# (see settings.BACKUP_SUBTEMPLATES_DIRS)
+SUBTEMPLATE_KINDS = {
+    "che:CHE_CI_ResponsibleParty": "contact",
+    "gmd:EX_Extent": "extent",
+    "gmd:MD_Format": "format",
+}
+
+
+def get_metadata_text(xml: bytes) -> str:
+    """
+    Returns the text of a metadata XML : text of the elements and values of the
+    attributes (e.g. xlink:href, codeListValue), one per line.
+    """
+
+    root = ET.fromstring(xml)
+    values = []
+
+    for element in root.iter():
+
+        if not isinstance(element.tag, str):
+            continue
+
+        values += element.attrib.values()
+
+        if element.text is not None and element.text.strip():
+            values.append(element.text.strip())
+
+    return "\n".join(values)
+
+
+def _read_fulltext_records(records: list) -> list:
+    """Work unit of the process pool, extracts the text of a chunk of records"""
+
+    rows = []
+
+    for path, kind in records:
+
+        row = {"uuid": None, "kind": kind, "path": path, "text": None, "error": None}
+
+        try:
+            if kind == "metadata":
+                with zipfile.ZipFile(path) as archive:
+                    names = archive.namelist()
+                    row["uuid"] = next(n for n in names if n.endswith("/info.xml")
+                                        and n.count("/") == 1).split("/")[0]
+                    xml = archive.read(next(n for n in names
+                                            if n.endswith("/metadata/metadata.xml")))
+            else:
+                row["uuid"] = os.path.splitext(os.path.basename(path))[0]
+                with open(path, "rb") as file:
+                    xml = file.read()
+
+            row["text"] = get_metadata_text(xml)
+
+        except Exception as error:
+            row["error"] = f"{type(error).__name__}: {error}"
+
+        rows.append(row)
+
+    return rows
+
+
+def _read_mirror_record(uuid: str, xml: bytes, document: dict) -> dict:
+    """Extracts the text of a record of a mirror, with the kinds of list_backup_records"""
+
+    row = {"uuid": uuid, "kind": "metadata", "path": None, "text": None, "error": None}
+
+    try:
+        row["text"] = get_metadata_text(xml)
+
+        if document.get("isTemplate") == "s":
+            root = utils.xpath_ns_url2code(ET.fromstring(xml).tag)
+            row["kind"] = SUBTEMPLATE_KINDS.get(root, "xml")
+
+    except Exception as error:
+        row["error"] = f"{type(error).__name__}: {error}"
+
+    return row
+
+
+def build_fulltext_index(source, db_path: str = None, workers: int = None,
+                            chunksize: int = 200) -> str:
+    """
+    Builds a SQLite FTS5 full-text index of the records of a backup folder (output of
+    GeocatBackup, backup_metadata or backup_metadata_xml) or of a CatalogueMirror.
+    The text of the records is indexed with the trigram tokenizer, so that searches
+    match any substring, case insensitive (unlike search_db, which is case sensitive).
+    Backups are read in a pool of processes (see analysis.map_backup_records).
+
+    Parameters:
+        source: path to a backup folder or CatalogueMirror instance
+        db_path (str): path of the SQLite file, by default fulltext.sqlite in the backup
+        folder, or the mirror path suffixed with _fulltext
+        workers (int): number of processes reading a backup, by default the number of CPUs
+        chunksize (int): number of records per work unit
+
+    Returns:
+        The path of the SQLite file
+    """
+
+    if isinstance(source, str):
+
+        if db_path is None:
+            db_path = os.path.join(source, "fulltext.sqlite")
+
+        rows = map_backup_records(records=list_backup_records(source),
+                                    reader=_read_fulltext_records, workers=workers,
+                                    chunksize=chunksize)
+    else:
+
+        if db_path is None:
+            db_path = f"{os.path.splitext(source.path)[0]}_fulltext.sqlite"
+
+        rows = (_read_mirror_record(uuid, xml, document)
+                    for uuid, xml, document in source.iter_records())
+
+    if os.path.isfile(db_path):
+        os.remove(db_path)
+
+    connection = sqlite3.connect(db_path)
+
+    try:
+        connection.executescript(SCHEMA)
+    except sqlite3.OperationalError as error:
+        connection.close()
+        raise Exception(f"SQLite {sqlite3.sqlite_version} has no FTS5 trigram tokenizer "
+                        "(SQLite >= 3.34 needed)") from error
+
+    print("Index full-text : ", end="\r")
+
+    count, errors = 0, 0
+    batch = []
+
+    try:
+        for row in rows:
+
+            if row["error"] is not None:
+                print(f"{utils.warningred('Could not index : ') + (row['path'] or row['uuid'])} ({row['error']})")
+                errors += 1
+                continue
+
+            if isinstance(source, str):
+                row["path"] = os.path.relpath(row["path"], source)
+
+            batch.append((row["uuid"], row["kind"], row["path"], row["text"]))
+            count += 1
+
+            if len(batch) >= chunksize:
+                connection.executemany("INSERT INTO records VALUES (?, ?, ?, ?)", batch)
+                connection.commit()
+                batch.clear()
+                print(f"Index full-text : {count} records", end="\r")
+
+        connection.executemany("INSERT INTO records VALUES (?, ?, ?, ?)", batch)
+        connection.execute("INSERT INTO records(records) VALUES ('optimize')")
+        connection.commit()
+
+    finally:
+        connection.close()
+
+    if errors == 0:
+        print(f"Index full-text : {utils.okgreen('Done')} ({count} records)")
+    else:
+        print(f"Index full-text : {utils.warningred(f'{errors} records failed')} ({count} records)")
+
+    return db_path
+
+
+class FulltextIndex():
+    """
+    Searches the full-text index built by build_fulltext_index.
+
+    Parameters :
+        db_path (str): path of the SQLite file
+    """
+
+    def __init__(self, db_path: str):
+
+        if not os.path.isfile(db_path):
+            raise Exception(f"No full-text index : {db_path}")
+
+        self.connection = sqlite3.connect(db_path)
+
+    def search(self, term: str, limit: int = None, snippet_size: int = 64) -> list:
+        """
+        Returns the records whose text contains term (any substring, case insensitive).
+
+        Parameters:
+            term (str): value to search for
+            limit (int): maximum number of records returned, all if None
+            snippet_size (int): number of characters of the snippets
+
+        Returns:
+            List of dict {"uuid", "kind", "path", "snippet"}, the term marked with [ ] in
+            the snippet. kind is "metadata", "contact", "extent", "format" or "xml" (see
+            analysis.list_backup_records), path is None for a mirror
+        """
+
+        # The trigram tokenizer can't match terms shorter than 3 characters, these are
+        # searched with a scan of the texts
+        if len(term) < 3:
+            query = "SELECT uuid, kind, path, text FROM records WHERE text LIKE ? ESCAPE '\\'"
+            params = ["%" + term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"]
+        else:
+            query = "SELECT uuid, kind, path, snippet(records, 3, '[', ']', '...', ?) " \
+                    "FROM records WHERE records MATCH ?"
+            params = [snippet_size, '"' + term.replace('"', '""') + '"']
+
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(limit)
+
+        results = []
+
+        for uuid, kind, path, snippet in self.connection.execute(query, params):
+
+            if len(term) < 3:
+                snippet = self.__get_snippet(snippet, term, snippet_size)
+
+            results.append({"uuid": uuid, "kind": kind, "path": path, "snippet": snippet})
+
+        return results
+
+    @staticmethod
+    def __get_snippet(text: str, term: str, size: int) -> str:
+        """Returns the part of text around the first occurrence of term, marked with [ ]"""
+
+        start = text.lower().find(term.lower())
+        before = max(0, start - (size - len(term)) // 2)
+        after = start + len(term) + (size - len(term)) // 2
+
+        return ("..." if before > 0 else "") + text[before:start] + \
+                f"[{text[start:start + len(term)]}]" + text[start + len(term):after] + \
+                ("..." if after < len(text) else "")
+
+    def close(self):
+        self.connection.close()
+
+
+def search_local(term: str, db_path: str, limit: int = None) -> list:
+    """
+    Searches a full-text index built by build_fulltext_index (see FulltextIndex.search).
+    Unlike search_db, no connection to the geocat database is needed.
+
+    Returns:
+        List of dict {"uuid", "kind", "path", "snippet"}
+    """
+
+    index = FulltextIndex(db_path)
+
+    try:
+        return index.search(term=term, limit=limit)
+    finally:
+        index.close()
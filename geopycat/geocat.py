@@ -4,15 +4,28 @@ import sys
 import xml.etree.ElementTree as ET
 import json
 from datetime import datetime
-from zipfile import ZipFile
+from collections import Counter
+from zipfile import ZipFile, is_zipfile
 import io
 import copy
+import contextlib
+import logging
+import secrets
 import requests
 import urllib3
 from dotenv import load_dotenv
 import psycopg2
+import psycopg2.pool
+import pandas as pd
 from geopycat import settings
 from geopycat import utils
+from geopycat.concurrency import run_parallel, AdaptiveLimiter
+from geopycat.cache import SearchCache, clears_search_cache
+from geopycat.session import GeocatSession
+from geopycat.tracing import Tracer, span, traced
+from geopycat.replay import ReplayStore
+from geopycat.snapshot import SnapshotWriter
+from geopycat.xmlstore import PackedXMLStore, train_dictionary, check_zstandard
 
 load_dotenv()
 
@@ -27,10 +40,18 @@ class GeocatAPI():
         username: geocat username
         password: geocat password
         no_login: if set to true, use the package without being authenticated in geocat
+        tracer: Tracer opening spans around the operations, HTTP requests and DB queries
+        (see geopycat.tracing)
+        record: path to a store where all HTTP responses are recorded (see geopycat.replay)
+        replay: path to a recorded store, HTTP responses are served from the store and no
+        request is sent to geocat. DB queries are not recorded nor replayed.
+        limiter: AdaptiveLimiter shared by the session and the bulk operations, adapting
+        the number of requests in flight to the load of the server (see geopycat.concurrency)
     """
 
     def __init__(self, env: str = 'int', username: str = None, password: str = None,
-                no_login: bool = False):
+                no_login: bool = False, tracer: Tracer = None, record: str = None,
+                replay: str = None, limiter: AdaptiveLimiter = None):
 
         if env not in settings.ENV:
             print(utils.warningred(f"No environment : {env}"))
@@ -39,6 +60,18 @@ class GeocatAPI():
             print(utils.warningred("WARNING : you choose the Production environment ! " \
                 "Be careful, all changes will be live on geocat.ch"))
         self.env = settings.ENV[env]
+        self.tracer = tracer
+        self.limiter = limiter
+
+        if record is not None and replay is not None:
+            print(utils.warningred("Cannot record and replay at the same time"))
+            sys.exit()
+        if record is not None:
+            self.replay_store = ReplayStore(record, mode="record")
+        elif replay is not None:
+            self.replay_store = ReplayStore(replay, mode="replay")
+        else:
+            self.replay_store = None
 
         if no_login:
             self.__username = ""
@@ -62,10 +95,12 @@ class GeocatAPI():
                     self.__password = getpass.getpass("Geocat Password : ")
 
         self.session = self.__get_token()
+        self.metrics = self.session.metrics
+        self.search_cache = None
 
     def __get_token(self) -> object:
         """Function to get the token and test which proxy is needed"""
-        session = requests.Session()
+        session = GeocatSession(tracer=self.tracer, replay=self.replay_store, limiter=self.limiter)
         session.cookies.clear()
 
         if self.__username != "":
@@ -100,8 +135,8 @@ class GeocatAPI():
 
         return session
 
-    def db_connect(self) -> object:
-        """Connect to geocat DB and returns a psycopg2 connection object"""
+    def __get_db_parameters(self) -> dict:
+        """Returns the connection parameters of geocat DB"""
 
         # Access database credentials from env variable if exists
         db_username = os.getenv('DB_USERNAME')
@@ -113,80 +148,158 @@ class GeocatAPI():
 
         _env = [k for k, v in settings.ENV.items() if v == self.env][0]
 
-        connection = psycopg2.connect(
-                host="database-lb.geocat.swisstopo.cloud",
-                database=f"geocat-{_env}",
-                user=db_username,
-                password=db_password)
+        return {
+            "host": "database-lb.geocat.swisstopo.cloud",
+            "database": f"geocat-{_env}",
+            "user": db_username,
+            "password": db_password,
+        }
+
+    def db_connect(self) -> object:
+        """Connect to geocat DB and returns a psycopg2 connection object"""
+
+        connection = psycopg2.connect(**self.__get_db_parameters())
 
         return connection
 
-    def es_deep_search(self, body: dict) -> list:
+    def db_pool(self, maxconn: int = 4) -> object:
         """
-        Performs deep paginated search using ES search API request.
+        Returns a psycopg2 ThreadedConnectionPool to geocat DB, for queries run
+        in parallel threads. Close it with closeall().
+
+        Parameters:
+            maxconn (int): maximum number of connections of the pool
+        """
+
+        return psycopg2.pool.ThreadedConnectionPool(minconn=1, maxconn=maxconn,
+                                                    **self.__get_db_parameters())
+
+    def enable_search_cache(self, ttl: int = 600, max_bytes: int = 256 * 1024 * 1024,
+                            cache_dir: str = None):
+        """
+        Caches the results of es_deep_search (hence get_uuids, get_ro_uuids...) for
+        identical requests. The cache is cleared by every method modifying records.
+
+        Parameters:
+            ttl (int): time to live of the cached results in seconds
+            max_bytes (int): maximum size of the cache
+            cache_dir (str): if given, the cache is stored on disk in this directory
+        """
+
+        self.search_cache = SearchCache(ttl=ttl, max_bytes=max_bytes, cache_dir=cache_dir)
+
+    def clear_search_cache(self):
+        """Clears the search cache if enabled. Called before and after every method modifying records."""
+
+        if getattr(self, "search_cache", None) is not None:
+            self.search_cache.clear()
+
+    def get_search_passes(self, body: dict) -> list:
+        """
+        Returns the searches needed to fetch all records matching a ES search API body.
+        Published records are searched without authentication, unpublished records
+        with the authenticated session (if logged-in and the query doesn't only match
+        published records).
+
         Args: body, the request's body
 
-        returns list of metadata index
+        returns list of tuple (session, body)
         """
-        uuids = []
 
-        proxies = self.session.proxies
-        unauth_session = requests.Session()
-        unauth_session.proxies = proxies
+        unauth_session = GeocatSession(metrics=self.session.metrics, tracer=self.tracer,
+                                        replay=self.session.replay, limiter=self.session.limiter)
+        unauth_session.proxies = self.session.proxies
 
-        headers = {"accept": "application/json", "Content-Type": "application/json"}
-        size = 2000
+        passes = [(unauth_session, body)]
+
+        if not utils.is_published_only(body["query"]) and self.session.auth is not None:
+
+            auth_body = copy.deepcopy(body)
+            filters = auth_body["query"]["bool"].get("filter", [])
+
+            if isinstance(filters, dict):
+                filters = [filters]
+
+            auth_body["query"]["bool"]["filter"] = filters + [{"term": {"isPublishedToAll": "false"}}]
 
-        published_only = False
-        if "query_string" in body["query"]["bool"]["must"][0]:
-            query_string = body["query"]["bool"]["must"][0]["query_string"]["query"]
-            if "(isPublishedToAll:\"true\")" in query_string:
-                published_only = True
+            passes.append((self.session, auth_body))
+
+        return passes
+
+    def es_deep_search_pages(self, body: dict, size: int = 2000):
+        """
+        Performs deep paginated search using ES search API request and yields the
+        hits page by page, so that large result sets are not held in memory.
+        The search cache is not used. Raises an exception if a page can't be fetched,
+        so that a result set is never silently truncated.
+
+        Args:
+            body: the request's body
+            size: number of hits per page
+
+        Yields:
+            list of metadata index (hits) of a page
+        """
 
+        headers = {"accept": "application/json", "Content-Type": "application/json"}
+
+        body = copy.deepcopy(body)
         body["size"] = size
-        body = json.dumps(body)
 
-        iterations = ["unauth"]
-        if not published_only and self.session.auth is not None:
-            iterations.append("auth")
+        for session, search_body in self.get_search_passes(body):
+
+            auth = session.auth is not None
+            page = 0
 
-        for i in iterations:
             while True:
 
-                if i == "unauth":
-                    response = unauth_session.post(url=self.env +
-                        "/geonetwork/srv/api/search/records/_search", headers=headers, data=body)
-                elif i == "auth":
-                    response = self.session.post(url=self.env +
-                        "/geonetwork/srv/api/search/records/_search", headers=headers, data=body)
+                with span(self.tracer, "es_deep_search.page", page=page, auth=auth):
+                    response = session.post(url=self.env +
+                        "/geonetwork/srv/api/search/records/_search", headers=headers,
+                        data=json.dumps(search_body))
 
-                if response.status_code == 200:
-                    for hit in response.json()["hits"]["hits"]:
-                        uuids.append(hit)
+                page += 1
 
-                    if len(response.json()["hits"]["hits"]) < size:
-                        break
+                if response.status_code != 200:
+                    raise Exception(f"Search failed at page {page} (HTTP {response.status_code})")
 
-                    body = json.loads(body)
-                    body["search_after"] = response.json()["hits"]["hits"][-1]["sort"]
-                    body = json.dumps(body)
+                hits = response.json()["hits"]["hits"]
 
-                else:
+                if len(hits) > 0:
+                    yield hits
+
+                if len(hits) < size:
                     break
 
-            body = json.loads(body)
-            if "search_after" in body:
-                del body["search_after"]
+                search_body["search_after"] = hits[-1]["sort"]
 
-            if "query_string" in locals():
-                query_string = query_string + "AND (isPublishedToAll:\"false\")"
-                body["query"]["bool"]["must"][0] = {"query_string": {"query": query_string,
-                    "default_operator": "AND"}}
-            else:
-                body["query"]["bool"]["must"].insert(0, {"query_string":
-                {"query": "(isPublishedToAll:\"false\")", "default_operator": "AND"}})
+    @traced("es_deep_search")
+    def es_deep_search(self, body: dict) -> list:
+        """
+        Performs deep paginated search using ES search API request.
+        Args: body, the request's body
 
-            body = json.dumps(body)
+        returns list of metadata index
+        """
+        uuids = []
+        size = 2000
+
+        cache_key = None
+        if getattr(self, "search_cache", None) is not None:
+            auth = self.session.auth[0] if self.session.auth is not None else None
+            # The environment is part of the key, a cache_dir can be shared between envs
+            cache_key = self.search_cache.get_key(body=dict(body, size=size),
+                                                    auth=f"{self.env}|{auth}")
+
+            cached = self.search_cache.get(cache_key)
+            if cached is not None:
+                return cached
+
+        for hits in self.es_deep_search_pages(body=body, size=size):
+            uuids += hits
+
+        if cache_key is not None:
+            self.search_cache.set(cache_key, uuids)
 
         return uuids
 
@@ -292,6 +405,7 @@ class GeocatAPI():
 
         return users
 
+    @traced("get_uuids", ("in_groups", "not_in_groups", "keywords", "q"))
     def get_uuids(self, with_harvested: bool = True, valid_only: bool = False, published_only:
                     bool = False, with_templates: bool = False, in_groups: list = None,
                     not_in_groups: list = None, keywords: list = None, q: str = None) -> list:
@@ -323,6 +437,167 @@ class GeocatAPI():
 
         return [i["_source"]["uuid"] for i in indexes]
 
+    @traced("count_records")
+    def count_records(self, with_harvested: bool = True, valid_only: bool = False,
+                        published_only: bool = False, with_templates: bool = False,
+                        in_groups: list = None, not_in_groups: list = None, keywords: list = None,
+                        q: str = None) -> int:
+        """
+        Count the metadata matching the given parameters without listing them.
+        Parameters are the same as get_uuids.
+        """
+
+        query = utils.get_search_query(with_harvested=with_harvested, valid_only=valid_only,
+                                published_only=published_only, with_templates=with_templates,
+                                in_groups=in_groups, not_in_groups=not_in_groups,
+                                keywords=keywords, q=q)
+
+        return self.count_query(query=query)
+
+    def count_query(self, query: dict) -> int:
+        """
+        Count the metadata matching a ES query (see utils.get_search_query) without
+        listing them, across the search passes (see get_search_passes).
+        """
+
+        body = {"query": query, "size": 0, "track_total_hits": True}
+
+        headers = {"accept": "application/json", "Content-Type": "application/json"}
+
+        count = 0
+
+        for session, search_body in self.get_search_passes(body):
+
+            response = session.post(url=self.env + "/geonetwork/srv/api/search/records/_search",
+                                    headers=headers, data=json.dumps(search_body))
+            response.raise_for_status()
+
+            count += response.json()["hits"]["total"]["value"]
+
+        return count
+
+    @traced("aggregate_records", ("by",))
+    def aggregate_records(self, by: list = None, with_harvested: bool = True,
+                            valid_only: bool = False, published_only: bool = False,
+                            with_templates: bool = False, in_groups: list = None,
+                            not_in_groups: list = None, keywords: list = None, q: str = None,
+                            page_size: int = 1000) -> pd.DataFrame:
+        """
+        Count the metadata matching the given parameters by values of index fields,
+        without listing them. Uses a composite aggregation paged by page_size buckets,
+        so high-cardinality fields are supported.
+        Parameters are the same as get_uuids.
+
+        Parameters:
+            by (list): index fields to aggregate by, e.g. ["groupOwner", "isHarvested"].
+            By default ["groupOwner"]
+            page_size (int): number of buckets per request
+
+        Returns:
+            A DataFrame with one column per field of by and a column "count"
+        """
+
+        if by is None:
+            by = ["groupOwner"]
+
+        body = {
+            "query": utils.get_search_query(with_harvested=with_harvested, valid_only=valid_only,
+                                published_only=published_only, with_templates=with_templates,
+                                in_groups=in_groups, not_in_groups=not_in_groups,
+                                keywords=keywords, q=q),
+            "size": 0,
+            "aggregations": {
+                "buckets": {
+                    "composite": {
+                        "size": page_size,
+                        "sources": [{field: {"terms": {"field": field}}} for field in by]
+                    }
+                }
+            }
+        }
+
+        headers = {"accept": "application/json", "Content-Type": "application/json"}
+
+        counts = {}
+
+        for session, search_body in self.get_search_passes(body):
+            while True:
+
+                response = session.post(url=self.env + "/geonetwork/srv/api/search/records/_search",
+                                        headers=headers, data=json.dumps(search_body))
+                response.raise_for_status()
+
+                aggregation = response.json()["aggregations"]["buckets"]
+
+                for bucket in aggregation["buckets"]:
+                    key = tuple(bucket["key"][field] for field in by)
+                    counts[key] = counts.get(key, 0) + bucket["doc_count"]
+
+                if "after_key" not in aggregation or len(aggregation["buckets"]) < page_size:
+                    break
+
+                search_body["aggregations"]["buckets"]["composite"]["after"] = aggregation["after_key"]
+
+        return pd.DataFrame([list(key) + [count] for key, count in counts.items()],
+                            columns=list(by) + ["count"])
+
+    @traced("export_snapshot", ("path", "file_format"))
+    def export_snapshot(self, path: str, fields: dict = None, file_format: str = "parquet",
+                        with_harvested: bool = True, valid_only: bool = False,
+                        published_only: bool = False, with_templates: bool = False,
+                        in_groups: list = None, not_in_groups: list = None,
+                        keywords: list = None, q: str = None) -> int:
+        """
+        Exports index fields of the metadata to a Parquet or Feather file with typed
+        columns, to be loaded with pandas.read_parquet or pandas.read_feather.
+        Only the given fields are requested from the index and the pages of the deep
+        search are written as they arrive, so that memory use doesn't grow with the
+        number of metadata. Needs pyarrow (optional dependency "snapshot").
+        Search parameters are the same as get_uuids.
+
+        Parameters:
+            path (str): path of the file
+            fields (dict): {index field: column type}, by default settings.SNAPSHOT_FIELDS.
+            Column types are "string", "int", "float", "bool", "timestamp" or "list"
+            file_format (str): "parquet" or "feather"
+
+        Returns:
+            The number of exported metadata
+        """
+
+        if fields is None:
+            fields = settings.SNAPSHOT_FIELDS
+
+        body = copy.deepcopy(settings.SEARCH_UUID_API_BODY)
+        body["query"] = utils.get_search_query(with_harvested=with_harvested,
+                                valid_only=valid_only, published_only=published_only,
+                                with_templates=with_templates, in_groups=in_groups,
+                                not_in_groups=not_in_groups, keywords=keywords, q=q)
+        body["_source"]["includes"] = list(fields)
+
+        writer = SnapshotWriter(path=path, fields=fields, file_format=file_format)
+
+        print("Export snapshot : ", end="\r")
+
+        try:
+            for hits in self.es_deep_search_pages(body=body):
+                writer.write([hit["_source"] for hit in hits])
+                print(f"Export snapshot : {writer.rows} metadata", end="\r")
+
+        except Exception:
+            # A partial snapshot would be taken for the whole catalogue
+            writer.close()
+            os.remove(path)
+            print(f"Export snapshot : {utils.warningred('Failed')}")
+            raise
+
+        writer.close()
+
+        print(f"Export snapshot : {utils.okgreen('Done')} ({writer.rows} metadata)")
+
+        return writer.rows
+
+    @traced("get_ro_uuids")
     def get_ro_uuids(self, valid_only: bool = False, published_only: bool = False,
                         with_template: bool = False) -> dict:
         """
@@ -347,36 +622,26 @@ class GeocatAPI():
 
         body["query"] = {
             "bool": {
-                    "must": []
+                    "filter": []
                 }
             }
-        
-        query_string = str()
 
-        if valid_only:
-            query_string = query_string + "(valid:\"1\") AND"
-        
-        if published_only:
-            query_string = query_string + "(isPublishedToAll:\"true\") AND"
-        
         if with_template:
-            body["query"]["bool"]["must"].append({"terms": {"isTemplate": ["s", "t"]}})
+            body["query"]["bool"]["filter"].append({"terms": {"isTemplate": ["s", "t"]}})
         else:
-            body["query"]["bool"]["must"].append({"terms": {"isTemplate": ["s"]}})
-
-        if len(query_string) > 0:
-            query_string = query_string[:-4]
-            body["query"]["bool"]["must"].insert(
-                0, 
-                {"query_string": {"query": query_string,
-                "default_operator": "AND"}}
-            )
+            body["query"]["bool"]["filter"].append({"terms": {"isTemplate": ["s"]}})
+
+        if valid_only:
+            body["query"]["bool"]["filter"].append({"term": {"valid": "1"}})
+
+        if published_only:
+            body["query"]["bool"]["filter"].append({"term": {"isPublishedToAll": "true"}})
 
         output = {}
 
         for type in subtemplate_types:
             
-            body["query"]["bool"]["must"].append(
+            body["query"]["bool"]["filter"].append(
                 {
                     "terms": {
                         "root": [
@@ -389,7 +654,7 @@ class GeocatAPI():
             indexes = self.es_deep_search(body=body)
             output[type] = [i["_source"]["uuid"] for i in indexes]
 
-            body["query"]["bool"]["must"].pop()
+            body["query"]["bool"]["filter"].pop()
        
         return output
 
@@ -414,6 +679,7 @@ class GeocatAPI():
                                             headers=headers, params=params)
             except requests.exceptions.ProxyError:
                 print("Proxy Error Occured, retry connection")
+                self.metrics.record_retry("GET", self.env + f"/geonetwork/srv/api/records/{uuid}/formatters/zip")
             else:
                 proxy_error = False
 
@@ -471,7 +737,88 @@ class GeocatAPI():
 
         return ownership
 
-    def backup_metadata(self, uuids: list, backup_dir: str = None, with_related: bool = True):
+    @traced("get_metadata_indexes", ("uuids",))
+    def get_metadata_indexes(self, uuids: list, fields: list = None,
+                            chunk_size: int = settings.INDEXES_CHUNK_SIZE) -> dict:
+        """
+        Fetches the elastic search index for a list of metadata.
+        Uuids are queried by chunks with a terms filter instead of one request per uuid.
+
+        Parameters:
+            uuids (list): list of metadata uuids
+            fields (list): index fields to return, if None the whole index is returned
+            chunk_size (int): number of uuids per search request
+
+        Returns:
+            Dict {uuid: index}, uuids not found in the index are not in the dict
+        """
+
+        headers = {"accept": "application/json", "Content-Type": "application/json"}
+
+        uuids = list(dict.fromkeys(uuids))
+        indexes = {}
+
+        for i in range(0, len(uuids), chunk_size):
+
+            chunk = uuids[i:i + chunk_size]
+
+            body = copy.deepcopy(settings.GET_MD_INDEXES_API_BODY)
+            body["query"]["bool"]["filter"][0]["terms"]["uuid"] = chunk
+            body["size"] = len(chunk)
+
+            if fields is None:
+                del body["_source"]
+            else:
+                body["_source"]["includes"] += [f for f in fields if f != "uuid"]
+
+            response = self.session.post(url=self.env +
+                    "/geonetwork/srv/api/search/records/_search", headers=headers,
+                    data=json.dumps(body))
+
+            if response.status_code != 200:
+                print(f"{utils.warningred('Could not retrieve indexes for a chunk of ')}{len(chunk)} md")
+                continue
+
+            for hit in response.json()["hits"]["hits"]:
+                indexes[hit["_source"]["uuid"]] = hit
+
+        for uuid in uuids:
+            if uuid not in indexes:
+                print(f"{utils.warningred('Could not retrieve index for md : ') + uuid}")
+
+        return indexes
+
+    @traced("get_metadata_ownerships", ("uuids",))
+    def get_metadata_ownerships(self, uuids: list) -> dict:
+        """
+        Returns the metadata group owner ID and user owner ID for a list of metadata.
+
+        Parameters:
+            uuids (list): list of metadata uuids
+
+        Returns:
+            Dict {uuid: {"owner_ID": int, "group_ID": int}}. Metadata whose index has no
+            owner or group owner are left out.
+        """
+
+        indexes = self.get_metadata_indexes(uuids=uuids, fields=["owner", "groupOwner"])
+
+        ownerships = {}
+
+        for uuid, index in indexes.items():
+            try:
+                ownerships[uuid] = {
+                    "owner_ID": int(index.get("ownerId", index["_source"].get("owner"))),
+                    "group_ID": int(index["_source"]["groupOwner"])
+                }
+            except (KeyError, TypeError, ValueError):
+                print(utils.warningred(f"{uuid} - no ownership in the index"))
+
+        return ownerships
+
+    @traced("backup_metadata", ("uuids", "with_related", "workers"))
+    def backup_metadata(self, uuids: list, backup_dir: str = None, with_related: bool = True,
+                        workers: int = 1):
         """
         Backup list of metadata as MEF zip file.
 
@@ -479,6 +826,7 @@ class GeocatAPI():
             uuids (list): list of metadata uuids to export
             Backup_dir (str): path to directory where to save the metadata
             with_related (bool): export related metadata as well
+            workers (int): number of metadata exported in parallel
         """
         if backup_dir is None:
             backup_dir = f"MetadataBackup_{datetime.now().strftime('%Y%m%d-%H%M%S')}"
@@ -488,51 +836,27 @@ class GeocatAPI():
 
         headers = {"accept": "application/x-gn-mef-2-zip"}
 
-        print("Backup metadata : ", end="\r")
-
         params = {
             "withRelated": with_related
         }
 
-        count = 1
-        for uuid in uuids:
-
-            proxy_error = True
-            while proxy_error:
-                try:
-                    response = self.session.get(url=self.env + f"/geonetwork/srv/api/records/{uuid}/formatters/zip",
-                                                headers=headers, params=params)
-                except requests.exceptions.ProxyError:
-                    print("Proxy Error Occured, retry connection")
-                else:
-                    proxy_error = False
-
-            if not response.ok:
-                print(f"{utils.warningred(f'The following Metadata could not be backup (HTTP {response.status_code}) : ') + uuid}")
-                continue
-
-            if not response.content:
-                print(f"{utils.warningred('The following Metadata returned empty content : ') + uuid}")
-                continue
-
-            uuid = uuid.replace(":", "_").replace("/", "_").replace("\\", "_").replace("'", "_").replace('"', "_")
-
-            with open(os.path.join(backup_dir, f"{uuid}.zip"), "wb") as output:
-                output.write(response.content)
-
-            print(f"Backup metadata : {round((count / len(uuids)) * 100, 1)}%", end="\r")
-
-            count += 1
+        self.__backup_records(uuids=uuids, backup_dir=backup_dir, formatter="zip",
+                                headers=headers, params=params, workers=workers)
 
-        print(f"Backup metadata : {utils.okgreen('Done')}")
-
-    def backup_metadata_xml(self, uuids: list, backup_dir: str = None):
+    @traced("backup_metadata_xml", ("uuids", "workers", "packed"))
+    def backup_metadata_xml(self, uuids: list, backup_dir: str = None, workers: int = 1,
+                            packed: bool = False):
         """
         Backup list of metadata as XML file.
 
         Parameters:
             uuids (list): list of metadata uuids to export
             Backup_dir (str): path to directory where to save the metadata
+            workers (int): number of metadata exported in parallel
+            packed (bool): if True, metadata are compressed with a zstd dictionary trained
+            on the first settings.XML_PACK_SAMPLES metadata and saved in a single pack file
+            with an index (see xmlstore.PackedXMLStore) instead of one file per metadata.
+            Needs zstandard (optional dependency "packed").
         """
         if backup_dir is None:
             backup_dir = f"MetadataBackup_{datetime.now().strftime('%Y%m%d-%H%M%S')}"
@@ -542,44 +866,101 @@ class GeocatAPI():
 
         headers = {"accept": "application/xml", "Content-Type": "application/xml"}
 
-        print("Backup metadata : ", end="\r")
-
         params = {
             "increasePopularity": False,
         }
 
-        count = 1
-        for uuid in uuids:
+        if not packed:
+            self.__backup_records(uuids=uuids, backup_dir=backup_dir, formatter="xml",
+                                    headers=headers, params=params, workers=workers)
+            return
+
+        check_zstandard()
+
+        first, rest = uuids[:settings.XML_PACK_SAMPLES], uuids[settings.XML_PACK_SAMPLES:]
+
+        samples = {}
+        self.__backup_records(uuids=first, backup_dir=backup_dir, formatter="xml",
+                                headers=headers, params=params, workers=workers,
+                                save=samples.__setitem__, total=len(uuids))
+
+        dictionary = train_dictionary(list(samples.values()))
+
+        with PackedXMLStore(backup_dir, mode="w", dictionary=dictionary) as store:
+
+            for uuid, xml in samples.items():
+                store.write(uuid, xml)
+
+            if len(rest) > 0:
+                self.__backup_records(uuids=rest, backup_dir=backup_dir, formatter="xml",
+                                        headers=headers, params=params, workers=workers,
+                                        save=store.write, done=len(first), total=len(uuids))
+
+            stats = store.get_stats()
+
+        print(f"Pack metadata : {utils.okgreen('Done')} (compression ratio {stats['ratio']})")
+
+    def __backup_records(self, uuids: list, backup_dir: str, formatter: str, headers: dict,
+                            params: dict, workers: int, save=None, done: int = 0,
+                            total: int = None):
+        """
+        Exports records with a formatter (zip or xml) into backup_dir, across a pool
+        of workers (see run_parallel). If save is given, save(uuid, content) is called
+        for every record instead of writing a file. For a backup run in several calls,
+        done and total give the progress of the whole backup.
+        """
+
+        if total is None:
+            total = len(uuids)
+
+        if done == 0:
+            print("Backup metadata : ", end="\r")
+
+        def backup(uuid):
+
+            url = self.env + f"/geonetwork/srv/api/records/{uuid}/formatters/{formatter}"
 
             proxy_error = True
             while proxy_error:
                 try:
-                    response = self.session.get(url=self.env + f"/geonetwork/srv/api/records/{uuid}/formatters/xml",
-                                                headers=headers, params=params)
+                    response = self.session.get(url=url, headers=headers, params=params)
                 except requests.exceptions.ProxyError:
                     print("Proxy Error Occured, retry connection")
+                    self.metrics.record_retry("GET", url)
                 else:
                     proxy_error = False
 
             if not response.ok:
                 print(f"{utils.warningred(f'The following Metadata could not be backup (HTTP {response.status_code}) : ') + uuid}")
-                continue
+                return
 
             if not response.content:
                 print(f"{utils.warningred('The following Metadata returned empty content : ') + uuid}")
-                continue
+                return
 
-            uuid = uuid.replace(":", "_").replace("/", "_").replace("\\", "_").replace("'", "_").replace('"', "_")
+            if save is not None:
+                return response.content
 
-            with open(os.path.join(backup_dir, f"{uuid}.xml"), "wb") as output:
+            with open(os.path.join(backup_dir, f"{utils.uuid_to_filename(uuid)}.{formatter}"), "wb") as output:
                 output.write(response.content)
 
-            print(f"Backup metadata : {round((count / len(uuids)) * 100, 1)}%", end="\r")
+        count = done + 1
+        for uuid, content, error in run_parallel(backup, uuids, workers=workers,
+                                                    limiter=self.limiter):
+
+            if error is not None:
+                print(f"{utils.warningred(f'The following Metadata could not be backup ({error}) : ') + uuid}")
+            elif content is not None:
+                save(uuid, content)
+
+            print(f"Backup metadata : {round((count / total) * 100, 1)}%", end="\r")
 
             count += 1
 
-        print(f"Backup metadata : {utils.okgreen('Done')}")    
+        if done + len(uuids) >= total:
+            print(f"Backup metadata : {utils.okgreen('Done')}")
 
+    @clears_search_cache
     def set_metadata_ownership(self, uuid: str, group_id: int, user_id: int) -> object:
         """
         Set metadata ownership
@@ -602,6 +983,136 @@ class GeocatAPI():
         
         return res
 
+    @contextlib.contextmanager
+    def selection_bucket(self, uuids: list, bucket: str = None):
+        """
+        Context manager loading uuids in a selection bucket of the server, to pass
+        bucket=<name> to the batch APIs (editing, validation, deletion, sharing, ownership)
+        instead of the uuids in the URL. Uuids are added by chunks of
+        settings.SELECTION_URL_CHUNK_SIZE. The bucket is cleared when the context exits.
+
+            with geocat.selection_bucket(uuids) as bucket:
+                geocat.session.put(url, params={"bucket": bucket})
+
+        Parameters:
+            uuids (list): list of metadata uuids
+            bucket (str): name of the bucket, a random one if None
+
+        Returns:
+            The name of the bucket
+        """
+
+        if bucket is None:
+            bucket = f"geopycat-{secrets.token_hex(4)}"
+
+        headers = {"accept": "application/json"}
+        url = self.env + f"/geonetwork/srv/api/selections/{bucket}"
+
+        try:
+            res = self.session.delete(url=url, headers=headers)
+
+            if res.status_code not in [200, 204]:
+                raise Exception(f"Could not clear selection bucket {bucket}")
+
+            for i in range(0, len(uuids), settings.SELECTION_URL_CHUNK_SIZE):
+
+                res = self.session.put(url=url, headers=headers,
+                                        params={"uuid": uuids[i:i + settings.SELECTION_URL_CHUNK_SIZE]})
+
+                if res.status_code not in [200, 201]:
+                    raise Exception(f"Could not add records to selection bucket {bucket}")
+
+            yield bucket
+
+        finally:
+            self.session.delete(url=url, headers=headers)
+
+    def __process_by_buckets(self, uuids: list, process, chunk_size: int, workers: int,
+                                label: str) -> dict:
+        """
+        Loads uuids in selection buckets by chunks (see selection_bucket) and calls
+        process(bucket) once per chunk, chunks being processed across a pool of workers
+        (see run_parallel).
+
+        Parameters:
+            process: callable taking the bucket name, returning the response of the batch request
+            label (str): name of the operation shown in the progress
+
+        Returns:
+            Dict {uuid: {"success": bool, "message": str}} (see utils.get_process_report).
+            Records whose outcome is not told by the response are reported as failed.
+        """
+
+        uuids = list(dict.fromkeys(uuids))
+        chunks = [uuids[i:i + chunk_size] for i in range(0, len(uuids), chunk_size)]
+        report = {}
+
+        def process_chunk(chunk):
+
+            with self.selection_bucket(uuids=chunk) as bucket:
+                return utils.get_process_report(process(bucket), chunk)
+
+        print(f"{label} : ", end="\r")
+
+        for chunk, outcomes, error in run_parallel(process_chunk, chunks, workers=workers,
+                                                    limiter=self.limiter):
+
+            if error is not None:
+                outcomes = {uuid: {"success": False, "message": str(error)} for uuid in chunk}
+
+            for outcome in outcomes.values():
+                if outcome["success"] is None:
+                    outcome["success"] = False
+
+            report.update(outcomes)
+            print(f"{label} : {round((len(report) / len(uuids)) * 100, 1)}%", end="\r")
+
+        failed = [uuid for uuid in uuids if not report[uuid]["success"]]
+
+        if len(failed) == 0:
+            print(f"{label} : {utils.okgreen('Done')}")
+        else:
+            print(f"{label} : {utils.warningred(f'{len(failed)} metadata failed')}")
+
+        return report
+
+    @traced("set_metadata_ownerships", ("uuids", "group_id", "user_id"))
+    @clears_search_cache
+    def set_metadata_ownerships(self, uuids: list, group_id: int, user_id: int,
+                                chunk_size: int = settings.SELECTION_CHUNK_SIZE,
+                                workers: int = 1) -> dict:
+        """
+        Set the ownership of a list of metadata. Uuids are loaded in a selection bucket
+        by chunks and the batch ownership API is called once per chunk.
+
+        Parameters:
+            uuids (list): list of metadata uuids
+            group_id (int): new group ID
+            user_id (int): new user ID
+            chunk_size (int): number of metadata per request
+            workers (int): number of chunks processed in parallel
+
+        Returns:
+            Dict {uuid: {"success": bool, "message": str}} (see utils.get_process_report)
+        """
+
+        headers = {"Content-Type": "application/json", "Accept": "application/json"}
+
+        def process(bucket):
+
+            parameters = {
+                "bucket": bucket,
+                "groupIdentifier": group_id,
+                "userIdentifier": user_id,
+            }
+
+            return self.session.put(url=self.env + "/geonetwork/srv/api/records/ownership",
+                                    headers=headers, params=parameters)
+
+        return self.__process_by_buckets(uuids=uuids, process=process, chunk_size=chunk_size,
+                                            workers=workers, label="Set metadata ownership")
+
+    @clears_search_cache
     def set_metadata_permission(self, uuid: str, permission: dict) -> object:
         """
         Set metadata permission
@@ -620,6 +1131,38 @@ class GeocatAPI():
 
         return res
 
+    @traced("set_metadata_permissions", ("uuids", "workers"))
+    @clears_search_cache
+    def set_metadata_permissions(self, uuids: list, permission: dict,
+                                    chunk_size: int = settings.SELECTION_CHUNK_SIZE,
+                                    workers: int = 1) -> dict:
+        """
+        Set the same permission to a list of metadata. Uuids are loaded in selection buckets
+        by chunks and the batch sharing API is called once per chunk.
+        Failed records can be given again to retry them only.
+
+        Parameters:
+            uuids (list): list of metadata uuids
+            permission (dict): permission in form of dict (see set_metadata_permission)
+            chunk_size (int): number of metadata per request
+            workers (int): number of chunks processed in parallel
+
+        Returns:
+            Dict {uuid: {"success": bool, "message": str}} (see utils.get_process_report)
+        """
+
+        headers = {"Content-Type": "application/json", "Accept": "application/json"}
+        body = json.dumps(permission)
+
+        def process(bucket):
+            return self.session.put(url=self.env + "/geonetwork/srv/api/records/sharing",
+                                    headers=headers, params={"bucket": bucket}, data=body)
+
+        return self.__process_by_buckets(uuids=uuids, process=process, chunk_size=chunk_size,
+                                            workers=workers, label="Set metadata permission")
+
+    @traced("edit_metadata", ("uuid",))
+    @clears_search_cache
     def edit_metadata(self, uuid: str, body: list, updateDateStamp: str ='true') -> object:
         """
         Edit a metadata by giving sets of xpath and xml.
@@ -646,6 +1189,187 @@ class GeocatAPI():
 
         return response
 
+    @traced("edit_metadata_many", ("uuids", "workers"))
+    @clears_search_cache
+    def edit_metadata_many(self, uuids: list, body: list, updateDateStamp: str = 'true',
+                            chunk_size: int = settings.SELECTION_CHUNK_SIZE,
+                            workers: int = 1) -> dict:
+        """
+        Apply the same edits to a list of metadata. Uuids are loaded in selection buckets
+        by chunks and the batchediting API is called once per chunk.
+
+        Parameters:
+            uuids (list): list of metadata uuids
+            body (list): the edits to perform : [{"xpath": xpath, "value": xml}, ...]
+            updateDateStamp (str): 'true' or 'false', default = 'true'. If 'false',
+            the update date and time of the metadata is not updated.
+            chunk_size (int): number of metadata per request
+            workers (int): number of chunks processed in parallel
+
+        Returns:
+            Dict {uuid: {"success": bool, "message": str}} (see utils.get_process_report)
+        """
+
+        headers = {"accept": "application/json", "Content-Type": "application/json"}
+        body = json.dumps(body)
+
+        def process(bucket):
+            return self.session.put(self.env + "/geonetwork/srv/api/records/batchediting",
+                                    headers=headers, data=body,
+                                    params={"bucket": bucket, "updateDateStamp": updateDateStamp})
+
+        return self.__process_by_buckets(uuids=uuids, process=process, chunk_size=chunk_size,
+                                            workers=workers, label="Edit metadata")
+
+    @traced("get_metadata_identifiers", ("uuids", "from_db"))
+    def get_metadata_identifiers(self, uuids: list, from_db: bool = False) -> dict:
+        """
+        Fetches the fileIdentifier of a list of metadata without downloading them.
+        By default the identifiers are taken from the search index, with from_db from the DB.
+
+        Parameters:
+            uuids (list): list of metadata uuids
+            from_db (bool): read gmd:fileIdentifier from the DB (admin only)
+
+        Returns:
+            Dict {uuid: fileIdentifier}, uuids without identifier are not in the dict
+        """
+
+        identifiers = {}
+
+        if not from_db:
+
+            indexes = self.get_metadata_indexes(uuids=uuids, fields=["metadataIdentifier"])
+
+            for uuid, index in indexes.items():
+                identifier = index["_source"].get("metadataIdentifier")
+                if isinstance(identifier, list):
+                    identifier = identifier[0] if len(identifier) > 0 else None
+                if identifier is not None:
+                    identifiers[uuid] = identifier
+
+            return identifiers
+
+        if not self.check_admin():
+            raise Exception("You must be admin to use this function")
+
+        namespaces = [[key, settings.NS[key]] for key in ["gmd", "gco"]]
+        connection = None
+
+        try:
+            connection = self.db_connect()
+            with connection.cursor() as cursor:
+
+                with span(self.tracer, "db.query", table="metadata", operation="xpath"):
+                    cursor.execute("SELECT uuid, (xpath('/*/gmd:fileIdentifier/gco:CharacterString/text()', " \
+                                    "data::xml, %s))[1]::text FROM public.metadata WHERE uuid = ANY(%s)",
+                                    (namespaces, list(uuids)))
+
+                for row in cursor:
+                    if row[1] is not None:
+                        identifiers[row[0]] = row[1]
+
+        except (Exception, psycopg2.Error) as error:
+            print("Error while fetching data from PostgreSQL", error)
+
+        finally:
+            if connection:
+                connection.close()
+
+        return identifiers
+
+    @traced("save_and_close", ("uuids", "from_db", "workers"))
+    def save_and_close(self, uuids: list, from_db: bool = False, workers: int = 4,
+                        logfile: str = None) -> dict:
+        """
+        Applies the process done while saving metadata in the editor (save and close).
+        The fileIdentifiers are fetched in bulk (see get_metadata_identifiers) and the
+        records are processed across a pool of workers.
+
+        Parameters:
+            uuids (list): list of metadata uuids to process
+            from_db (bool): read fileIdentifiers from the DB instead of the search index
+            workers (int): number of records processed in parallel
+            logfile (str): path to a log file. If it already exists, records logged as
+            successfully saved and closed are skipped and new entries are appended.
+
+        Returns:
+            Dict {uuid: bool}, True if the record was successfully saved and closed
+        """
+
+        logger = logging.getLogger(__name__)
+        level = logger.level
+        handler = None
+        done = set()
+
+        if logfile is not None:
+
+            if os.path.isfile(logfile):
+                with open(logfile, encoding="utf-8") as file:
+                    for line in file:
+                        if line.rstrip().endswith(" - successfully saved and closed"):
+                            done.add(line.rstrip().split(" - ")[-2])
+
+            handler = logging.FileHandler(logfile, encoding="utf-8")
+            handler.setFormatter(logging.Formatter("%(asctime)s - %(levelname)s - %(message)s",
+                                                    datefmt="%Y-%m-%d %H:%M:%S"))
+            logger.addHandler(handler)
+            logger.setLevel(logging.INFO)
+
+        todo = [uuid for uuid in uuids if uuid not in done]
+        results = {uuid: True for uuid in uuids if uuid in done}
+
+        identifiers = self.get_metadata_identifiers(uuids=todo, from_db=from_db)
+
+        def save(uuid):
+
+            body = [{
+                "xpath": "/gmd:fileIdentifier/gco:CharacterString",
+                "value": f"<gn_replace>{utils.xmlify(identifiers[uuid])}</gn_replace>"
+            }]
+
+            return utils.process_ok(self.edit_metadata(uuid=uuid, body=body, updateDateStamp=False))
+
+        for uuid in todo:
+            if uuid not in identifiers:
+                print(utils.warningred(f"{uuid} - unable to retrieve uuid"))
+                logger.error(f"{uuid} - unable to retrieve uuid")
+                results[uuid] = False
+
+        todo = [uuid for uuid in todo if uuid in identifiers]
+
+        print("Save and close : ", end="\r")
+        count = 0
+
+        try:
+            for uuid, success, error in run_parallel(save, todo, workers=workers,
+                                                        limiter=self.limiter):
+
+                count += 1
+                results[uuid] = bool(success)
+
+                if success:
+                    logger.info(f"{uuid} - successfully saved and closed")
+                elif error is not None:
+                    print(utils.warningred(f"{uuid} - unsuccessfully saved and closed ({error})"))
+                    logger.error(f"{uuid} - unsuccessfully saved and closed ({error})")
+                else:
+                    print(utils.warningred(f"{uuid} - unsuccessfully saved and closed"))
+                    logger.error(f"{uuid} - unsuccessfully saved and closed")
+
+                print(f"Save and close : {round((count / len(todo)) * 100, 1)}%", end="\r")
+
+        finally:
+            if handler is not None:
+                logger.removeHandler(handler)
+                logger.setLevel(level)
+                handler.close()
+
+        print(f"Save and close : {utils.okgreen('Done')}")
+
+        return results
+
+    @clears_search_cache
     def validate_metadata(self, uuid: str) -> object:
         """
         Performs internal validation of a given metadata.
@@ -681,6 +1405,7 @@ class GeocatAPI():
         if res.status_code != 204:
             raise Exception("Could not close edit session")
 
+    @clears_search_cache
     def validate_external_metadata(self, uuid: str) -> None:
         """
         Performs external validation of a given metadata.
@@ -712,6 +1437,35 @@ class GeocatAPI():
 
             raise Exception("validation process failed")
 
+    @traced("validate_metadata_many", ("uuids", "workers"))
+    @clears_search_cache
+    def validate_metadata_many(self, uuids: list,
+                                chunk_size: int = settings.SELECTION_CHUNK_SIZE,
+                                workers: int = 1) -> dict:
+        """
+        Performs external validation of a list of metadata (see validate_external_metadata).
+        Uuids are loaded in selection buckets by chunks and the validation API is called
+        once per chunk.
+
+        Parameters:
+            uuids (list): list of metadata uuids
+            chunk_size (int): number of metadata per request
+            workers (int): number of chunks processed in parallel
+
+        Returns:
+            Dict {uuid: {"success": bool, "message": str}} (see utils.get_process_report)
+        """
+
+        headers = {"accept": "application/json", "Content-Type": "application/json"}
+
+        def process(bucket):
+            return self.session.put(url=f"{self.env}/geonetwork/srv/api/records/validate",
+                                    headers=headers, params={"bucket": bucket})
+
+        return self.__process_by_buckets(uuids=uuids, process=process, chunk_size=chunk_size,
+                                            workers=workers, label="Validate metadata")
+
+    @clears_search_cache
     def reset_validation_status(self, uuid: str) -> None:
         """
         Reset validation status of given metadata.
@@ -737,6 +1491,8 @@ class GeocatAPI():
         if not utils.process_ok(res):
             raise Exception("resetting validation status failed")
 
+    @traced("search_and_replace")
+    @clears_search_cache
     def search_and_replace(self, search: str, replace: str, escape_wildcard: bool = True):
         """
         Performs search and replace at the DB level.
@@ -761,8 +1517,9 @@ class GeocatAPI():
             connection = self.db_connect()
             with connection.cursor() as cursor:
 
-                cursor.execute("SELECT uuid FROM public.metadata where (istemplate='n' OR istemplate='y')" \
-                                f"AND data like '%{search_sql}%'")
+                with span(self.tracer, "db.query", table="metadata", operation="like"):
+                    cursor.execute("SELECT uuid FROM public.metadata where (istemplate='n' OR istemplate='y')" \
+                                    f"AND data like '%{search_sql}%'")
 
                 for row in cursor:
                     metadata_uuids.append(row[0])
@@ -797,6 +1554,7 @@ class GeocatAPI():
             else:
                 print(utils.warningred(f"Metadata {uuid} : {search} unsuccessfully replaced by {replace}"))
 
+    @traced("search_db")
     def search_db(self, search: str, escape_wildcard: bool = True) -> list:
         """
         Performs search at the DB level. Returns list of metadata UUID where search
@@ -821,8 +1579,9 @@ class GeocatAPI():
             connection = self.db_connect()
             with connection.cursor() as cursor:
 
-                cursor.execute("SELECT uuid FROM public.metadata where (istemplate='n' OR istemplate='y')" \
-                                f"AND data like '%{search_sql}%'")
+                with span(self.tracer, "db.query", table="metadata", operation="like"):
+                    cursor.execute("SELECT uuid FROM public.metadata where (istemplate='n' OR istemplate='y')" \
+                                    f"AND data like '%{search_sql}%'")
 
                 for row in cursor:
                     metadata_uuids.append(row[0])
@@ -836,6 +1595,136 @@ class GeocatAPI():
         
         return metadata_uuids
 
+    def search_db_xpath(self, xpath: str, search: str = None, workers: int = 4,
+                        with_templates: bool = True,
+                        range_size: int = settings.DB_SCAN_RANGE_SIZE):
+        """
+        Performs search at the DB level restricted to an xpath. Matches are evaluated by
+        PostgreSQL xpath() on the metadata XML, so only the values of the xpath are
+        searched (e.g. "//gmd:distributionInfo//gmd:URL/text()" instead of the whole XML).
+        The metadata table is split in ranges of ids scanned in parallel, each on its own
+        connection of a pool (see db_pool). Results are yielded as soon as a range is done.
+        Raises an exception if a range can't be searched.
+
+        Parameters:
+            xpath (str): xpath evaluated on the metadata, with the namespaces of settings.NS.
+            Text and attribute nodes give their (unescaped) value, elements their XML.
+            search (str): value to search for in the values of the xpath (LIKE '%search%',
+            "%" and "_" are escaped). If None, every metadata having a value at the xpath matches.
+            workers (int): number of ranges scanned in parallel
+            with_templates (bool): searches templates as well
+            range_size (int): number of metadata ids per range
+
+        Yields:
+            Tuple (uuid, list of the matching values of the xpath)
+        """
+
+        if not self.check_admin():
+            raise Exception("You must be admin to use this function")
+
+        istemplate = ["n", "y"] if with_templates else ["n"]
+        namespaces = [[code, url] for code, url in settings.NS.items()]
+
+        # xpath() returns text and attribute nodes XML-escaped (&, <, >, carriage return),
+        # the search is escaped the same way and the values are unescaped
+        escapes = [("&", "&amp;"), ("<", "&lt;"), (">", "&gt;"), ("\r", "&#x0d;")]
+
+        def unescape(value):
+            if value.startswith("<"):
+                return value
+            for char, entity in reversed(escapes):
+                value = value.replace(entity, char)
+            return value
+
+        like = None
+        if search is not None:
+            for char, entity in escapes:
+                search = search.replace(char, entity)
+            like = "%" + search.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+
+        # Records which are not well-formed XML are skipped instead of failing the range
+        query = "SELECT uuid, ARRAY(SELECT value::text FROM unnest(xpath(%(xpath)s, " \
+                "CASE WHEN xml_is_well_formed_document(data) THEN data::xml END, " \
+                "%(namespaces)s)) AS value WHERE %(like)s IS NULL OR value::text LIKE %(like)s) " \
+                "FROM public.metadata WHERE id >= %(start)s AND id < %(end)s " \
+                "AND istemplate = ANY(%(istemplate)s)"
+
+        # Opened in the body, a decorator would close the span at the first result
+        with span(self.tracer, "search_db_xpath", xpath=xpath, workers=workers):
+
+            pool = self.db_pool(maxconn=workers)
+
+            try:
+                connection = pool.getconn()
+
+                try:
+                    with connection.cursor() as cursor:
+                        cursor.execute("SELECT min(id), max(id) FROM public.metadata")
+                        min_id, max_id = cursor.fetchone()
+                finally:
+                    pool.putconn(connection)
+
+                if min_id is None:
+                    return
+
+                ranges = [(start, start + range_size) for start in range(min_id, max_id + 1, range_size)]
+
+                def scan(id_range):
+
+                    connection = pool.getconn()
+
+                    try:
+                        with connection.cursor() as cursor:
+
+                            with span(self.tracer, "db.query", table="metadata", operation="xpath",
+                                        start=id_range[0]):
+                                cursor.execute(query, {"xpath": xpath, "namespaces": namespaces,
+                                                        "like": like, "start": id_range[0],
+                                                        "end": id_range[1], "istemplate": istemplate})
+
+                            return [(uuid, [unescape(match) for match in matches])
+                                    for uuid, matches in cursor if len(matches) > 0]
+
+                    finally:
+                        connection.rollback()
+                        pool.putconn(connection)
+
+                count = 1
+
+                # Closed before the pool if the caller stops iterating early
+                with contextlib.closing(run_parallel(scan, ranges, workers=workers)) as results:
+
+                    for id_range, rows, error in results:
+
+                        if error is not None:
+                            print(utils.warningred("Search DB : Failed"))
+                            raise Exception(f"Could not search ids {id_range[0]} to "
+                                            f"{id_range[1] - 1} : {error}") from error
+
+                        yield from rows
+
+                        print(f"Search DB : {round((count / len(ranges)) * 100, 1)}%", end="\r")
+                        count += 1
+
+                print(f"Search DB : {utils.okgreen('Done')}")
+
+            finally:
+                pool.closeall()
+
+    @staticmethod
+    def __get_mef_uuid(path: str) -> str:
+        """Returns the uuid written in the info.xml of a MEF, None if not readable"""
+
+        try:
+            with ZipFile(path) as archive:
+                info = next(name for name in archive.namelist()
+                            if name.endswith("/info.xml") and name.count("/") == 1)
+                return ET.fromstring(archive.read(info)).findtext("./general/uuid")
+        except Exception:
+            return None
+
+    @traced("delete_metadata", ("uuid",))
+    @clears_search_cache
     def delete_metadata(self, uuid: str) -> object:
         """
         Delete metadata
@@ -855,4 +1744,75 @@ class GeocatAPI():
         response = self.session.delete(self.env + f"/geonetwork/srv/api/records/{uuid}",
                             params=params, headers=headers)
 
-        return response
\ No newline at end of file
+        return response
+
+    @traced("delete_metadata_many", ("uuids", "workers"))
+    @clears_search_cache
+    def delete_metadata_many(self, uuids: list, backup_dir: str,
+                                chunk_size: int = settings.SELECTION_CHUNK_SIZE,
+                                workers: int = 4) -> dict:
+        """
+        Delete a list of metadata after backing them up. All metadata are first
+        exported as MEF into backup_dir across a pool of workers. Only the metadata
+        whose backup file was written and is a valid MEF of the same uuid are deleted,
+        by chunks loaded in selection buckets (one request per chunk). Metadata whose
+        uuids give the same file name (e.g. a:b and a_b) share a backup file and are
+        never deleted.
+
+        Parameters:
+            uuids (list): list of metadata uuids to delete
+            backup_dir (str): path to directory where to save the metadata before deletion
+            chunk_size (int): number of metadata deleted per request
+            workers (int): number of metadata backed up and chunks deleted in parallel
+
+        Returns:
+            Dict {uuid: {"success": bool, "message": str}} (see utils.get_process_report).
+            Metadata whose backup failed are not deleted and reported as failed.
+        """
+
+        uuids = list(dict.fromkeys(uuids))
+        start = datetime.now().timestamp()
+
+        self.backup_metadata(uuids=uuids, backup_dir=backup_dir, with_related=False,
+                                workers=workers)
+
+        report = {}
+        backed_up = []
+
+        filenames = [utils.uuid_to_filename(uuid) for uuid in uuids]
+        shared = {filename for filename, count in Counter(filenames).items() if count > 1}
+
+        for uuid, filename in zip(uuids, filenames):
+
+            path = os.path.join(backup_dir, f"{filename}.zip")
+
+            if filename in shared:
+                report[uuid] = {"success": False,
+                                "message": "Backup file shared with another uuid, not deleted"}
+
+            # A file left by a previous backup doesn't count
+            elif os.path.isfile(path) and os.path.getmtime(path) >= int(start) \
+                and is_zipfile(path) and self.__get_mef_uuid(path) == uuid:
+                backed_up.append(uuid)
+
+            else:
+                report[uuid] = {"success": False, "message": "Backup failed, not deleted"}
+
+        if len(report) > 0:
+            print(utils.warningred(f"{len(report)} metadata could not be backup and are not deleted"))
+
+        if len(backed_up) == 0:
+            return report
+
+        headers = {"accept": "application/json", "Content-Type": "application/json"}
+
+        def process(bucket):
+            return self.session.delete(self.env + "/geonetwork/srv/api/records",
+                                        headers=headers,
+                                        params={"bucket": bucket, "withBackup": False})
+
+        report.update(self.__process_by_buckets(uuids=backed_up, process=process,
+                                                chunk_size=chunk_size, workers=workers,
+                                                label="Delete metadata"))
+
+        return report
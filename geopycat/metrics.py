@@ -0,0 +1,165 @@
+import json
+import threading
+from urllib.parse import urlparse
+
+
+# Path segments followed by an identifier, and the placeholder of the identifier
+TEMPLATED_SEGMENTS = {
+    "records": "{uuid}",
+    "entries": "{uuid}",
+    "users": "{id}",
+    "groups": "{id}",
+    "selections": "{bucket}",
+    "vocabularies": "{thesaurus}",
+}
+
+# Path segments that are part of the endpoint even when following a templated segment
+FIXED_SEGMENTS = ["_search", "batchediting", "validate", "ownership", "sharing", "owners",
+                    "importfromxml"]
+
+LATENCY_BUCKETS = [0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60]
+
+
+def get_endpoint_template(url: str) -> str:
+    """
+    Returns the GeoNetwork endpoint template of an url,
+    e.g. /geonetwork/srv/api/records/{uuid}/formatters/zip
+    """
+
+    segments = urlparse(url).path.split("/")
+
+    for i in range(1, len(segments)):
+        if segments[i - 1] in TEMPLATED_SEGMENTS and segments[i] not in FIXED_SEGMENTS \
+            and segments[i] != "":
+            segments[i] = TEMPLATED_SEGMENTS[segments[i - 1]]
+        elif segments[i].isdigit():
+            segments[i] = "{id}"
+
+    return "/".join(segments)
+
+
+class RequestMetrics():
+    """
+    Collects per endpoint metrics of the HTTP requests : request counts, status codes,
+    errors, retries, bytes in and out and latency histogram.
+    Endpoints are grouped by method and template (see get_endpoint_template).
+    """
+
+    def __init__(self):
+
+        self.__endpoints = {}
+        self.__lock = threading.Lock()
+
+    def __get_endpoint(self, method: str, url: str) -> dict:
+
+        key = (method.upper(), get_endpoint_template(url))
+
+        if key not in self.__endpoints:
+            self.__endpoints[key] = {
+                "method": key[0],
+                "endpoint": key[1],
+                "requests": 0,
+                "errors": 0,
+                "retries": 0,
+                "status_codes": {},
+                "bytes_in": 0,
+                "bytes_out": 0,
+                "latency_sum": 0.0,
+                "latency_buckets": [0] * (len(LATENCY_BUCKETS) + 1),
+            }
+
+        return self.__endpoints[key]
+
+    def record(self, method: str, url: str, status_code: int, latency: float,
+                bytes_out: int = 0, bytes_in: int = 0):
+        """
+        Records a request. status_code is None if the request raised an error.
+        """
+
+        with self.__lock:
+
+            endpoint = self.__get_endpoint(method, url)
+
+            endpoint["requests"] += 1
+            endpoint["bytes_in"] += bytes_in
+            endpoint["bytes_out"] += bytes_out
+            endpoint["latency_sum"] += latency
+
+            if status_code is None:
+                endpoint["errors"] += 1
+            else:
+                status = str(status_code)
+                endpoint["status_codes"][status] = endpoint["status_codes"].get(status, 0) + 1
+
+            bucket = next((i for i, limit in enumerate(LATENCY_BUCKETS) if latency <= limit),
+                            len(LATENCY_BUCKETS))
+            endpoint["latency_buckets"][bucket] += 1
+
+    def record_retry(self, method: str, url: str):
+        """Records the retry of a request"""
+
+        with self.__lock:
+            self.__get_endpoint(method, url)["retries"] += 1
+
+    def reset(self):
+        """Removes all collected metrics"""
+
+        with self.__lock:
+            self.__endpoints = {}
+
+    def to_dict(self) -> list:
+        """Returns the metrics as list of dict, one per endpoint"""
+
+        with self.__lock:
+            return json.loads(json.dumps(list(self.__endpoints.values())))
+
+    def to_json(self) -> str:
+        """Returns the metrics as json"""
+
+        return json.dumps(self.to_dict(), indent=4)
+
+    def to_prometheus(self) -> str:
+        """Returns the metrics in the Prometheus text exposition format"""
+
+        endpoints = self.to_dict()
+
+        def labels(endpoint):
+            return f'method="{endpoint["method"]}",endpoint="{endpoint["endpoint"]}"'
+
+        lines = ["# TYPE geopycat_http_requests_total counter"]
+        for endpoint in endpoints:
+            for status, count in endpoint["status_codes"].items():
+                lines.append(f'geopycat_http_requests_total{{{labels(endpoint)},status="{status}"}} {count}')
+
+        for name in ["errors", "retries", "bytes_in", "bytes_out"]:
+            lines.append(f"# TYPE geopycat_http_{name}_total counter")
+            for endpoint in endpoints:
+                lines.append(f"geopycat_http_{name}_total{{{labels(endpoint)}}} {endpoint[name]}")
+
+        lines.append("# TYPE geopycat_http_request_duration_seconds histogram")
+        for endpoint in endpoints:
+
+            cumulative = 0
+            for limit, count in zip(LATENCY_BUCKETS + ["+Inf"], endpoint["latency_buckets"]):
+                cumulative += count
+                lines.append(f"geopycat_http_request_duration_seconds_bucket{{{labels(endpoint)},"
+                                f'le="{limit}"}} {cumulative}')
+
+            lines.append(f"geopycat_http_request_duration_seconds_sum{{{labels(endpoint)}}} "
+                            f"{endpoint['latency_sum']}")
+            lines.append(f"geopycat_http_request_duration_seconds_count{{{labels(endpoint)}}} "
+                            f"{endpoint['requests']}")
+
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: str):
+        """
+        Writes the metrics to a file. Prometheus text format if the file extension
+        is .prom or .txt, json otherwise.
+        """
+
+        with open(path, "w") as file:
+            if path.endswith((".prom", ".txt")):
+                file.write(self.to_prometheus())
+            else:
+                file.write(self.to_json())
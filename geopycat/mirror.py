@@ -0,0 +1,216 @@
+import copy
+import json
+import zlib
+import sqlite3
+from datetime import datetime
+from geopycat import settings
+from geopycat import utils
+from geopycat.geocat import GeocatAPI
+from geopycat.concurrency import run_parallel
+from geopycat.tracing import traced
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS records (
+    uuid TEXT PRIMARY KEY,
+    change_date TEXT,
+    is_template TEXT,
+    document TEXT,
+    xml BLOB,
+    synced TEXT
+);
+CREATE TABLE IF NOT EXISTS syncs (
+    started TEXT,
+    finished TEXT,
+    added INTEGER,
+    updated INTEGER,
+    deleted INTEGER,
+    failed INTEGER
+);
+"""
+
+
+class CatalogueMirror(GeocatAPI):
+    """
+    Local mirror of the catalogue : metadata XML and index documents stored in a SQLite
+    file (XML zlib compressed). The first sync downloads every record, the following ones
+    only the records whose changeDate moved and remove the records no longer in the
+    catalogue (diff of the uuids).
+
+        mirror = CatalogueMirror(path="geocat.sqlite", env="prod")
+        mirror.sync()
+        xml = mirror.get_xml(uuid)
+
+    Parameters :
+        path (str): path to the SQLite file of the mirror, created if not existing
+        with_harvested (bool): mirrors harvested records as well
+        with_templates (bool): mirrors templates records as well
+        in_groups (list): mirrors records belonging to list of group ids. ids given as int
+        fields (list): index fields stored, if None the whole index document is stored
+        kwargs: parameters of GeocatAPI (env, username, password...)
+    """
+
+    def __init__(self, path: str, with_harvested: bool = True, with_templates: bool = False,
+                    in_groups: list = None, fields: list = None, **kwargs):
+
+        super().__init__(**kwargs)
+
+        self.path = path
+        self.fields = fields
+        self.query = utils.get_search_query(with_harvested=with_harvested,
+                                            with_templates=with_templates, in_groups=in_groups)
+
+        self.connection = sqlite3.connect(path)
+        self.connection.executescript(SCHEMA)
+
+    def __get_remote_dates(self) -> dict:
+        """Returns the changeDate of every record of the catalogue in scope {uuid: changeDate}"""
+
+        body = copy.deepcopy(settings.SEARCH_UUID_API_BODY)
+        body["query"] = self.query
+        body["_source"]["includes"] = ["uuid", "changeDate"]
+
+        return {hit["_source"]["uuid"]: hit["_source"].get("changeDate")
+                for hit in self.es_deep_search(body=body)}
+
+    def __get_local_dates(self) -> dict:
+        """Returns the changeDate of every record of the mirror {uuid: changeDate}"""
+
+        return dict(self.connection.execute("SELECT uuid, change_date FROM records"))
+
+    @traced("mirror.sync", ("workers", "full"))
+    def sync(self, workers: int = 4, full: bool = False) -> dict:
+        """
+        Synchronizes the mirror with the catalogue. Records whose changeDate differs from
+        the mirror (or all records if full) are downloaded, XML across a pool of workers
+        and index documents by chunks. Records not in the catalogue anymore are removed,
+        only if the catalogue was listed completely (fewer records listed than counted
+        skips the removal). Records that failed are kept unchanged and retried at the
+        next sync.
+
+        Parameters:
+            workers (int): number of records downloaded in parallel
+            full (bool): downloads every record, whatever its changeDate
+
+        Returns:
+            Dict {"added": int, "updated": int, "deleted": int, "failed": list of uuids}
+        """
+
+        started = datetime.now().isoformat(timespec="seconds")
+
+        # A cached search would hide the latest changes
+        self.clear_search_cache()
+
+        total = self.count_query(query=self.query)
+        remote = self.__get_remote_dates()
+        local = self.__get_local_dates()
+
+        # An incomplete listing would remove records still in the catalogue
+        if len(remote) < total:
+            print(utils.warningred(f"Sync mirror : {len(remote)} records listed out of {total}, "
+                                    "no record removed"))
+            deleted = []
+        else:
+            deleted = [uuid for uuid in local if uuid not in remote]
+        changed = [uuid for uuid, date in remote.items()
+                    if full or uuid not in local or local[uuid] != date]
+
+        print(f"Sync mirror : {len(changed)} records to download, {len(deleted)} to remove")
+
+        self.connection.executemany("DELETE FROM records WHERE uuid = ?",
+                                    [(uuid,) for uuid in deleted])
+        self.connection.commit()
+
+        documents = self.get_metadata_indexes(uuids=changed, fields=self.fields) \
+                        if len(changed) > 0 else {}
+
+        headers = {"accept": "application/xml", "Content-Type": "application/xml"}
+        params = {"increasePopularity": False}
+
+        def download(uuid):
+
+            response = self.session.get(url=self.env +
+                            f"/geonetwork/srv/api/records/{uuid}/formatters/xml",
+                            headers=headers, params=params)
+            response.raise_for_status()
+
+            return response.content
+
+        report = {"added": 0, "updated": 0, "deleted": len(deleted), "failed": []}
+        count = 1
+
+        for uuid, xml, error in run_parallel(download, changed, workers=workers,
+                                                limiter=self.limiter):
+
+            if error is not None or uuid not in documents or not xml:
+                report["failed"].append(uuid)
+
+            else:
+                document = documents[uuid]["_source"]
+                self.connection.execute("INSERT OR REPLACE INTO records VALUES (?, ?, ?, ?, ?, ?)",
+                    (uuid, remote[uuid], document.get("isTemplate"), json.dumps(document),
+                        zlib.compress(xml), datetime.now().isoformat(timespec="seconds")))
+
+                report["updated" if uuid in local else "added"] += 1
+
+            if count % 500 == 0:
+                self.connection.commit()
+
+            print(f"Sync mirror : {round((count / len(changed)) * 100, 1)}%", end="\r")
+            count += 1
+
+        self.connection.execute("INSERT INTO syncs VALUES (?, ?, ?, ?, ?, ?)",
+            (started, datetime.now().isoformat(timespec="seconds"), report["added"],
+                report["updated"], report["deleted"], len(report["failed"])))
+        self.connection.commit()
+
+        if len(report["failed"]) == 0:
+            print(f"Sync mirror : {utils.okgreen('Done')}")
+        else:
+            print(f"Sync mirror : {utils.warningred(str(len(report['failed'])) + ' records failed')}")
+
+        return report
+
+    def get_mirrored_uuids(self) -> list:
+        """Returns the uuids of the records in the mirror"""
+
+        return [row[0] for row in self.connection.execute("SELECT uuid FROM records ORDER BY uuid")]
+
+    def get_xml(self, uuid: str) -> bytes:
+        """Returns the metadata XML of a record from the mirror, None if not mirrored"""
+
+        row = self.connection.execute("SELECT xml FROM records WHERE uuid = ?", (uuid,)).fetchone()
+
+        return zlib.decompress(row[0]) if row is not None else None
+
+    def get_index(self, uuid: str) -> dict:
+        """Returns the index document of a record from the mirror, None if not mirrored"""
+
+        row = self.connection.execute("SELECT document FROM records WHERE uuid = ?",
+                                        (uuid,)).fetchone()
+
+        return json.loads(row[0]) if row is not None else None
+
+    def iter_records(self):
+        """Yields (uuid, metadata XML, index document) for every record of the mirror"""
+
+        cursor = self.connection.execute("SELECT uuid, xml, document FROM records ORDER BY uuid")
+
+        for uuid, xml, document in cursor:
+            yield uuid, zlib.decompress(xml), json.loads(document)
+
+    def get_last_sync(self) -> dict:
+        """Returns the summary of the last sync, None if never synced"""
+
+        cursor = self.connection.execute("SELECT * FROM syncs ORDER BY started DESC LIMIT 1")
+        row = cursor.fetchone()
+
+        if row is None:
+            return None
+
+        return dict(zip([column[0] for column in cursor.description], row))
+
+    def close(self):
+        """Closes the SQLite connection of the mirror"""
+
+        self.connection.close()
@@ -0,0 +1,142 @@
+import io
+import os
+import json
+import zlib
+import sqlite3
+import hashlib
+import threading
+import requests
+from requests.models import PreparedRequest
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    fingerprint TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    method TEXT,
+    url TEXT,
+    status_code INTEGER,
+    headers TEXT,
+    cookies TEXT,
+    content BLOB,
+    PRIMARY KEY (fingerprint, seq)
+);
+"""
+
+
+class ReplayStore():
+    """
+    On-disk store of HTTP responses (SQLite, zlib compressed content) used by GeocatSession
+    to record the responses of a run and replay them offline.
+
+    Requests are identified by a fingerprint of the method, the url with its parameters
+    and the body (auth and XSRF headers are ignored). The responses of identical requests
+    are replayed in the order they were recorded, the last one is repeated.
+
+    Parameters :
+        path (str): path to the store
+        mode (str): 'record' or 'replay'
+    """
+
+    def __init__(self, path: str, mode: str = "replay"):
+
+        if mode not in ["record", "replay"]:
+            raise ValueError(f"Unknown mode : {mode}, must be 'record' or 'replay'")
+
+        # sqlite would create an empty store and every request would miss
+        if mode == "replay" and not os.path.isfile(path):
+            raise Exception(f"No recorded store : {path}")
+
+        self.path = path
+        self.mode = mode
+
+        self.__connection = sqlite3.connect(path, check_same_thread=False)
+        self.__connection.executescript(SCHEMA)
+        self.__lock = threading.Lock()
+        self.__counts = {}
+
+    @staticmethod
+    def get_fingerprint(method: str, url: str, params=None, data=None, json_body=None,
+                        files=None) -> str:
+        """Returns the fingerprint of a request"""
+
+        request = PreparedRequest()
+        request.prepare_url(url, params)
+
+        digest = hashlib.sha256(f"{method.upper()} {request.url}".encode("utf-8"))
+
+        if isinstance(data, dict):
+            data = json.dumps(data, sort_keys=True)
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        if data is not None:
+            digest.update(data)
+
+        if json_body is not None:
+            digest.update(json.dumps(json_body, sort_keys=True).encode("utf-8"))
+
+        for name, file in sorted((files or {}).items()):
+            content = file[1] if isinstance(file, tuple) else file
+            digest.update(name.encode("utf-8"))
+            digest.update(content if isinstance(content, bytes) else str(content).encode("utf-8"))
+
+        return digest.hexdigest()
+
+    def __next_seq(self, fingerprint: str) -> int:
+
+        seq = self.__counts.get(fingerprint, 0)
+        self.__counts[fingerprint] = seq + 1
+        return seq
+
+    def save(self, fingerprint: str, response: requests.Response):
+        """Records a response"""
+
+        with self.__lock:
+            self.__connection.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (fingerprint, self.__next_seq(fingerprint), response.request.method,
+                    response.url, response.status_code, json.dumps(dict(response.headers)),
+                    json.dumps(response.cookies.get_dict()), zlib.compress(response.content)))
+            self.__connection.commit()
+
+    def load(self, fingerprint: str) -> tuple:
+        """
+        Returns the next recorded response of a fingerprint, None if not recorded.
+
+        Returns:
+            Tuple (requests.Response, dict of cookies set by the response)
+        """
+
+        with self.__lock:
+
+            seq = self.__next_seq(fingerprint)
+            row = self.__connection.execute(
+                "SELECT method, url, status_code, headers, cookies, content FROM responses "
+                "WHERE fingerprint = ? AND seq <= ? ORDER BY seq DESC LIMIT 1",
+                (fingerprint, seq)).fetchone()
+
+        if row is None:
+            return None
+
+        method, url, status_code, headers, cookies, content = row
+
+        response = requests.Response()
+        response.status_code = status_code
+        response.url = url
+        response.headers = requests.structures.CaseInsensitiveDict(json.loads(headers))
+        response._content = zlib.decompress(content)
+        response.raw = io.BytesIO(response._content)
+        response.request = requests.Request(method=method, url=url).prepare()
+
+        # Content is stored decoded
+        response.headers.pop("Content-Encoding", None)
+        response.headers["Content-Length"] = str(len(response._content))
+        response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+
+        return response, json.loads(cookies)
+
+    def close(self):
+        """Closes the store"""
+
+        with self.__lock:
+            self.__connection.close()
@@ -0,0 +1,131 @@
+import time
+import requests
+from geopycat.metrics import RequestMetrics, get_endpoint_template
+from geopycat.tracing import Tracer
+from geopycat.replay import ReplayStore
+from geopycat.concurrency import AdaptiveLimiter, CONGESTION_STATUS_CODES, RETRY_STATUS_CODES
+
+
+class GeocatSession(requests.Session):
+    """
+    requests Session recording metrics of every request (see RequestMetrics)
+    and opening a "http.request" span for every request if a tracer is given.
+    With a replay store in record mode, every response is saved to the store. In replay
+    mode, responses are served from the store and no request is sent.
+    With a limiter, every request waits for a slot of the limiter and its latency and
+    outcome are fed back to the limiter. Requests rejected by the server (HTTP 429, 503)
+    are sent again as configured in the limiter.
+
+    Parameters :
+        metrics: RequestMetrics instance shared between sessions, a new one if None
+        tracer: Tracer instance (see geopycat.tracing)
+        replay: ReplayStore instance (see geopycat.replay)
+        limiter: AdaptiveLimiter instance (see geopycat.concurrency)
+    """
+
+    def __init__(self, metrics: RequestMetrics = None, tracer: Tracer = None,
+                    replay: ReplayStore = None, limiter: AdaptiveLimiter = None):
+
+        super().__init__()
+
+        self.metrics = RequestMetrics() if metrics is None else metrics
+        self.tracer = tracer
+        self.replay = replay
+        self.limiter = limiter
+
+    def request(self, method, url, *args, **kwargs):
+
+        if self.tracer is None:
+            return self.__request(method, url, *args, **kwargs)
+
+        with self.tracer.span("http.request", {"http.method": method, "http.url": url,
+                                "geonetwork.endpoint": get_endpoint_template(url)}) as span:
+
+            response = self.__request(method, url, *args, **kwargs)
+            span.set_attribute("http.status_code", response.status_code)
+
+            return response
+
+    def __request(self, method, url, *args, **kwargs):
+
+        if self.limiter is None:
+            return self.__timed_request(method, url, *args, **kwargs)
+
+        # File objects are read so that the request can be sent again
+        self.__read_files(kwargs)
+        attempt = 0
+
+        while True:
+
+            with self.limiter:
+                response = self.__timed_request(method, url, *args, **kwargs)
+
+            if response.status_code not in RETRY_STATUS_CODES or attempt >= self.limiter.retries:
+                return response
+
+            attempt += 1
+            self.metrics.record_retry(method, url)
+            time.sleep(self.limiter.backoff * attempt)
+
+    def __timed_request(self, method, url, *args, **kwargs):
+
+        start = time.perf_counter()
+
+        try:
+            response = self.__send(method, url, *args, **kwargs)
+
+        except Exception:
+            latency = time.perf_counter() - start
+            self.metrics.record(method=method, url=url, status_code=None, latency=latency)
+            if self.limiter is not None:
+                self.limiter.record(latency=latency, error=True, method=method, url=url)
+            raise
+
+        latency = time.perf_counter() - start
+        body = response.request.body
+        self.metrics.record(method=method, url=url, status_code=response.status_code,
+                            latency=latency, bytes_out=len(body) if body is not None else 0,
+                            bytes_in=len(response.content))
+
+        if self.limiter is not None:
+            self.limiter.record(latency=latency,
+                                error=response.status_code in CONGESTION_STATUS_CODES,
+                                method=method, url=url)
+
+        return response
+
+    def __send(self, method, url, *args, **kwargs):
+
+        if self.replay is None:
+            return super().request(method, url, *args, **kwargs)
+
+        # File objects are read so that their content is part of the fingerprint
+        self.__read_files(kwargs)
+
+        fingerprint = ReplayStore.get_fingerprint(method=method, url=url,
+                        params=kwargs.get("params"), data=kwargs.get("data"),
+                        json_body=kwargs.get("json"), files=kwargs.get("files"))
+
+        if self.replay.mode == "record":
+            response = super().request(method, url, *args, **kwargs)
+            self.replay.save(fingerprint, response)
+            return response
+
+        recorded = self.replay.load(fingerprint)
+
+        if recorded is None:
+            raise requests.exceptions.ConnectionError(f"No recorded response for {method} {url}")
+
+        response, cookies = recorded
+        self.cookies.update(cookies)
+
+        return response
+
+    @staticmethod
+    def __read_files(kwargs: dict):
+        """Replaces the file objects of the files argument by their content"""
+
+        if kwargs.get("files") is not None:
+            kwargs["files"] = {name: (file[0], file[1].read()) + tuple(file[2:])
+                                if isinstance(file, tuple) and hasattr(file[1], "read") else file
+                                for name, file in kwargs["files"].items()}
@@ -81,4 +81,84 @@ GET_MD_INDEX_API_BODY = {
             ]
         }
     }
-}
\ No newline at end of file
+}
+
+GET_MD_INDEXES_API_BODY = {
+    "query": {
+        "bool": {
+            "filter": [
+                {
+                    "terms": {
+                        "uuid": []
+                    }
+                },
+                {
+                    "terms": {
+                        "isTemplate": [
+                            "n",
+                            "y",
+                            "s"
+                        ]
+                    }
+                }
+            ]
+        }
+    },
+    "_source": {
+        "includes": [
+            "uuid"
+        ]
+    }
+}
+
+INDEXES_CHUNK_SIZE = 500
+
+# Number of records per selection bucket for the batch operations
+SELECTION_CHUNK_SIZE = 500
+# Number of uuids per request when adding records to a selection bucket (sent in the url)
+SELECTION_URL_CHUNK_SIZE = 50
+
+# Index fields exported by export_snapshot and their column type
+# ("string", "int", "float", "bool", "timestamp" or "list" of strings)
+SNAPSHOT_FIELDS = {
+    "uuid": "string",
+    "isTemplate": "string",
+    "isHarvested": "bool",
+    "isPublishedToAll": "bool",
+    "valid": "int",
+    "groupOwner": "int",
+    "owner": "int",
+    "mainLanguage": "string",
+    "resourceTitleObject": "string",
+    "resourceType": "list",
+    "createDate": "timestamp",
+    "changeDate": "timestamp",
+}
+
+# Number of metadata ids per range scanned by search_db_xpath
+DB_SCAN_RANGE_SIZE = 5000
+
+# Packed XML backups (see xmlstore.PackedXMLStore) : number of records the zstd
+# dictionary is trained on, size of the dictionary in bytes and compression level
+XML_PACK_SAMPLES = 1000
+XML_PACK_DICT_SIZE = 112640
+XML_PACK_LEVEL = 9
+
+MEF_PACK_MAX_RECORDS = 100
+MEF_PACK_MAX_BYTES = 50 * 1024 * 1024
+
+BACKUP_MANIFEST = "metadata_manifest.json"
+
+BACKUP_SUBTEMPLATES_DIRS = {
+    "Subtemplates_contacts": "contact",
+    "Subtemplates_extents": "extent",
+    "Subtemplates_formats": "format",
+}
+
+KEYWORD_FIELDS = [
+    "tag.default",
+    "tag.langfre",
+    "tag.langger",
+    "tag.langita",
+    "tag.langeng",
+]
@@ -0,0 +1,117 @@
+from dateutil import parser as dateparser
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+
+def check_pyarrow():
+    """Raises an exception if pyarrow (optional dependency) is not installed"""
+
+    if pa is None:
+        raise Exception("pyarrow is needed to export snapshots : pip install pyarrow")
+
+
+def get_arrow_type(kind: str):
+    """Returns the pyarrow type of a column type of settings.SNAPSHOT_FIELDS"""
+
+    types = {
+        "string": pa.string(),
+        "int": pa.int64(),
+        "float": pa.float64(),
+        "bool": pa.bool_(),
+        "timestamp": pa.timestamp("ms", tz="UTC"),
+        "list": pa.list_(pa.string()),
+    }
+
+    if kind not in types:
+        raise ValueError(f"Unknown column type : {kind}, must be one of {list(types)}")
+
+    return types[kind]
+
+
+def convert_value(value, kind: str):
+    """
+    Converts a value of the index to a column type. Multilingual objects give their
+    default value, lists their first value (except for list columns).
+    Values that can't be converted give None.
+    """
+
+    if isinstance(value, dict):
+        value = value.get("default")
+
+    if kind == "list":
+        if value is None:
+            return None
+        return [str(v.get("default") if isinstance(v, dict) else v)
+                for v in (value if isinstance(value, list) else [value])]
+
+    if isinstance(value, list):
+        value = value[0] if len(value) > 0 else None
+
+    if isinstance(value, dict):
+        value = value.get("default")
+
+    if value is None:
+        return None
+
+    try:
+        if kind == "int":
+            return int(value)
+        if kind == "float":
+            return float(value)
+        if kind == "bool":
+            return value in [True, 1, "1", "true", "y"]
+        if kind == "timestamp":
+            return dateparser.isoparse(value)
+    except (TypeError, ValueError):
+        return None
+
+    return str(value)
+
+
+class SnapshotWriter():
+    """
+    Writes batches of index documents to a Parquet or Feather (Arrow IPC) file
+    with typed columns.
+
+    Parameters :
+        path (str): path of the file
+        fields (dict): {field: column type} (see settings.SNAPSHOT_FIELDS)
+        file_format (str): "parquet" or "feather"
+    """
+
+    def __init__(self, path: str, fields: dict, file_format: str = "parquet"):
+
+        check_pyarrow()
+
+        if file_format not in ["parquet", "feather"]:
+            raise ValueError(f"Unknown format : {file_format}, must be 'parquet' or 'feather'")
+
+        self.fields = fields
+        self.schema = pa.schema([(field, get_arrow_type(kind)) for field, kind in fields.items()])
+        self.rows = 0
+
+        if file_format == "parquet":
+            self.__writer = pq.ParquetWriter(path, self.schema, compression="zstd")
+        else:
+            self.__writer = pa.ipc.new_file(path, self.schema,
+                                            options=pa.ipc.IpcWriteOptions(compression="zstd"))
+
+    def write(self, documents: list):
+        """Writes a batch of index documents (_source of the hits)"""
+
+        columns = [[convert_value(document.get(field), kind) for document in documents]
+                    for field, kind in self.fields.items()]
+
+        batch = pa.RecordBatch.from_arrays([pa.array(column, type=self.schema.field(i).type)
+                                            for i, column in enumerate(columns)],
+                                            schema=self.schema)
+
+        self.__writer.write_batch(batch)
+        self.rows += len(documents)
+
+    def close(self):
+        self.__writer.close()
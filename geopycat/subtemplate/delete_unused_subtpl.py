@@ -1,6 +1,8 @@
 import psycopg2
 from geopycat import geocat
 from geopycat import utils
+from geopycat.tracing import span
+from geopycat.concurrency import run_parallel
 from datetime import datetime
 from dateutil.relativedelta import relativedelta
 
@@ -33,10 +35,11 @@ class DeleteUnusedSubtemplate(geocat):
             if len(uuids[key]) > 0:
                 res = input(f"{len(uuids[key])} {key} found. Are you sure to delete them ? (y/n)")
                 if res == 'y':
-                    for uuid in uuids[key]:
-                        response = self.delete_metadata(uuid=uuid)
+                    for uuid, response, error in run_parallel(
+                        lambda uuid: self.delete_metadata(uuid=uuid), uuids[key], workers=1,
+                        limiter=self.limiter):
 
-                        if response.status_code == 204:
+                        if error is None and response.status_code == 204:
                             print(f"{key} {uuid} : {utils.okgreen('successfully deleted')}")
                         else:
                             print(f"{key} {uuid} : {utils.warningred('could not be deleted')}")
@@ -55,21 +58,23 @@ class DeleteUnusedSubtemplate(geocat):
 
             with connection.cursor() as cursor:
 
-                cursor.execute(
-                    "SELECT UUID,data FROM public.metadata WHERE (istemplate='s')" \
-                    "and uuid NOT LIKE '%hoheitsgebiet%' " \
-                    "and uuid NOT LIKE '%bezirk%' " \
-                    "and uuid NOT LIKE '%kantonsgebiet%' " \
-                    "and uuid NOT LIKE '%landesgebiet%' " \
-                    f"and changedate < '{self.date_limit.strftime('%Y-%m-%d')}'"
-                )
+                with span(self.tracer, "db.query", table="metadata", operation="select"):
+                    cursor.execute(
+                        "SELECT UUID,data FROM public.metadata WHERE (istemplate='s')" \
+                        "and uuid NOT LIKE '%hoheitsgebiet%' " \
+                        "and uuid NOT LIKE '%bezirk%' " \
+                        "and uuid NOT LIKE '%kantonsgebiet%' " \
+                        "and uuid NOT LIKE '%landesgebiet%' " \
+                        f"and changedate < '{self.date_limit.strftime('%Y-%m-%d')}'"
+                    )
 
                 ro_uuids = cursor.fetchall()
                 count = 0
 
                 for row in ro_uuids:
 
-                    cursor.execute(f"SELECT uuid FROM public.metadata WHERE data like '%{row[0]}%'")
+                    with span(self.tracer, "db.query", table="metadata", operation="like"):
+                        cursor.execute(f"SELECT uuid FROM public.metadata WHERE data like '%{row[0]}%'")
                     if cursor.rowcount == 0:
                         if row[1].startswith("<che:CHE_CI_ResponsibleParty"):
                             uuids_contact.append(row[0])
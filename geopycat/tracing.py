@@ -0,0 +1,99 @@
+import functools
+import inspect
+
+
+class Span():
+    """
+    Span returned by Tracer.span. Used as context manager, the span ends when
+    the context exits. This base class does nothing.
+    """
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+    def set_attribute(self, key: str, value):
+        """Sets an attribute (e.g. uuid, page number, status code) on the span"""
+
+
+NOOP_SPAN = Span()
+
+
+class Tracer():
+    """
+    Interface to plug a tracing system into geopycat. Give an instance to GeocatAPI
+    (or any subclass) with the tracer parameter.
+
+    geopycat opens a span for every high-level operation (get_uuids, backup_metadata,
+    restore_metadata_from_mef, search_db...), and child spans for every HTTP request
+    ("http.request") and DB query ("db.query").
+
+    Override span to return a context manager with a set_attribute method, e.g. for
+    OpenTelemetry :
+
+        class OtelTracer(Tracer):
+            def __init__(self):
+                self.tracer = opentelemetry.trace.get_tracer("geopycat")
+
+            def span(self, name, attributes):
+                return self.tracer.start_as_current_span(name, attributes=attributes)
+
+    Parent and child spans are linked through contextvars, which are propagated to the
+    threads of the bulk operations.
+    """
+
+    def span(self, name: str, attributes: dict) -> Span:
+        """Returns a span for the operation name with the given attributes"""
+        return NOOP_SPAN
+
+
+def span(tracer: Tracer, name: str, **attributes) -> Span:
+    """Returns a span of tracer, or a no-op span if tracer is None"""
+
+    if tracer is None:
+        return NOOP_SPAN
+
+    return tracer.span(name, attributes)
+
+
+def traced(name: str, attributes: tuple = ()):
+    """
+    Decorator opening a span around a method of GeocatAPI when self.tracer is set.
+    Nothing is done when no tracer is set.
+
+    Parameters:
+        name (str): name of the span
+        attributes (tuple): names of the method parameters recorded as span attributes.
+        For lists, the number of items is recorded as "<name>.count".
+    """
+
+    def decorator(method):
+
+        signature = inspect.signature(method)
+
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+
+            tracer = getattr(self, "tracer", None)
+
+            if tracer is None:
+                return method(self, *args, **kwargs)
+
+            arguments = signature.bind(self, *args, **kwargs).arguments
+            values = {}
+
+            for key in attributes:
+                if key in arguments:
+                    if isinstance(arguments[key], (list, tuple, set)):
+                        values[f"{key}.count"] = len(arguments[key])
+                    else:
+                        values[key] = arguments[key]
+
+            with tracer.span(name, values):
+                return method(self, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
@@ -1,23 +1,35 @@
 import json
 import logging
-import xml.etree.ElementTree as ET
+import re
+from functools import lru_cache
+from lxml import etree
 from geopycat import settings
 
 
+_NS_URL2CODE = {"{" + url + "}": f"{code}:" for code, url in settings.NS.items()}
+_NS_URL2CODE_RE = re.compile("|".join(re.escape(url) for url in _NS_URL2CODE))
+
+_NS_CODE2URL = {f"{code}:": "{" + url + "}" for code, url in settings.NS.items()}
+_NS_CODE2URL_RE = re.compile(r"(?<![\w.-])(?:" + "|".join(re.escape(code) for code in _NS_CODE2URL) + ")")
+
+
 def xpath_ns_url2code(path: str) -> str:
     """Replace the namespace url by the namespace acronym in the given xpath"""
-    for key in settings.NS:
-        path = path.replace("{" + settings.NS[key] + "}", f"{key}:")
-
-    return path
+    return _NS_URL2CODE_RE.sub(lambda match: _NS_URL2CODE[match.group(0)], path)
 
 
 def xpath_ns_code2url(path: str) -> str:
-    """Replace the namespace url by the namespace acronym in the given xpath"""
-    for key in settings.NS:
-        path = path.replace(f"{key}:", "{" + settings.NS[key] + "}")
+    """Replace the namespace acronym by the namespace url in the given xpath"""
+    return _NS_CODE2URL_RE.sub(lambda match: _NS_CODE2URL[match.group(0)], path)
 
-    return path
+
+@lru_cache(maxsize=256)
+def get_xpath(path: str) -> etree.XPath:
+    """
+    Returns a compiled lxml XPath for the given path using the namespaces of settings.NS.
+    Compiled XPaths are cached, call the returned object with an lxml element.
+    """
+    return etree.XPath(path, namespaces=settings.NS)
 
 
 def get_log_config(logfile: str = None, level: str = "INFO", log2stdout: bool = True):
@@ -109,29 +121,139 @@ def process_ok(response):
         return False
 
 
-def get_metadata_languages(metadata: bytes) -> dict:
+def get_process_report(response, uuids: list) -> dict:
     """
-    Fetches all languages of the metadata (given as bytes string).
+    Splits the response of a multi records geocat API request into per record outcomes.
+
+    Works for following requests :
+     - /{portal}/api/records (import of multi records MEF)
+     - /{portal}/api/records/batchediting
+     - /{portal}/api/records/ownership
+     - /{portal}/api/records/sharing
+
+    Args:
+        response:
+            object, required, the response object of the API request
+        uuids:
+            list, required, the uuids of the records processed by the request
+
+    Returns:
+        dict: {uuid: {"success": bool or None, "message": str}}. success is None when
+        the outcome of the record could not be told from the report.
+    """
+    outcomes = {uuid: {"success": None, "message": None} for uuid in uuids}
+
+    if response.status_code not in [200, 201]:
+        for uuid in uuids:
+            outcomes[uuid] = {"success": False, "message": f"HTTP {response.status_code}"}
+        return outcomes
+
+    r_json = json.loads(response.text)
+
+    failed = []
+    for error in r_json.get("errors", []) + \
+        [e for errors in r_json.get("metadataErrors", {}).values() for e in errors]:
+
+        message = error.get("message") if isinstance(error, dict) else str(error)
+        uuid = error.get("uuid") if isinstance(error, dict) else None
+
+        if uuid is None:
+            uuid = next((u for u in uuids if message is not None and u in message), None)
+
+        if uuid in outcomes:
+            outcomes[uuid] = {"success": False, "message": message}
+            failed.append(uuid)
+
+    for infos in r_json.get("metadataInfos", {}).values():
+        for info in infos:
+            if info.get("uuid") in outcomes and info["uuid"] not in failed:
+                outcomes[info["uuid"]] = {"success": True, "message": info.get("message")}
+
+    # Records not mentioned in the report are successful only if the report has no failure
+    if len(r_json.get("errors", [])) == 0 and r_json.get("numberOfRecordNotFound", 0) == 0 \
+        and r_json.get("numberOfRecordsNotEditable", 0) == 0 \
+        and r_json.get("numberOfNullRecords", 0) == 0 \
+        and r_json.get("numberOfRecordsWithErrors", 0) == 0 \
+        and r_json.get("numberOfRecordsProcessed", len(uuids)) == len(uuids):
+
+        for uuid in uuids:
+            if outcomes[uuid]["success"] is None:
+                outcomes[uuid]["success"] = True
+
+    for uuid in uuids:
+        if outcomes[uuid]["success"] is None:
+            outcomes[uuid]["message"] = "Record not reported as processed"
+
+    return outcomes
+
+
+def get_metadata_languages(metadata) -> dict:
+    """
+    Fetches all languages of the metadata (given as bytes, str or lxml element).
     Returns main and additonal metadata languages in form of a dictionnary.
     """
 
+    # lxml refuses str with an encoding declaration
+    if isinstance(metadata, str):
+        metadata = metadata.encode("utf-8")
+
+    if isinstance(metadata, bytes):
+        metadata = etree.fromstring(metadata)
+
     languages = {
         "language": None,
         "locales": list(),
     }
 
-    xml_root = ET.fromstring(metadata)
+    language = get_xpath("./gmd:language/gmd:LanguageCode/@codeListValue")(metadata)
+    languages["language"] = str(language[0]) if len(language) > 0 else None
 
-    languages["language"] = xml_root.find("./gmd:language/gmd:LanguageCode",
-                    namespaces=settings.NS).attrib["codeListValue"]
+    for lang in get_xpath("./gmd:locale//gmd:LanguageCode/@codeListValue")(metadata):
+        if lang != languages["language"] and lang not in languages["locales"]:
+            languages["locales"].append(str(lang))
 
-    for lang in xml_root.findall("./gmd:locale//gmd:LanguageCode", namespaces=settings.NS):
-            if lang.attrib["codeListValue"] != languages["language"] and \
-                lang.attrib["codeListValue"] not in languages["locales"]:
+    return languages
 
-                languages["locales"].append(lang.attrib["codeListValue"])
 
-    return languages
+def get_metadata_fields(metadata) -> dict:
+    """
+    Extracts in one pass the main fields of a metadata (given as bytes, str or lxml element)
+    with compiled XPaths.
+
+    Returns:
+        dict: {"uuid": str, "language": str, "locales": list, "title": str,
+        "titles": {locale: str}}
+    """
+
+    # lxml refuses str with an encoding declaration
+    if isinstance(metadata, str):
+        metadata = metadata.encode("utf-8")
+
+    if isinstance(metadata, bytes):
+        metadata = etree.fromstring(metadata)
+
+    fields = get_metadata_languages(metadata)
+
+    uuid = get_xpath("./gmd:fileIdentifier/gco:CharacterString/text()")(metadata)
+    fields["uuid"] = str(uuid[0]) if len(uuid) > 0 else None
+
+    citation = "./gmd:identificationInfo/*/gmd:citation/gmd:CI_Citation/gmd:title"
+
+    title = get_xpath(f"{citation}/gco:CharacterString/text()")(metadata)
+    fields["title"] = str(title[0]) if len(title) > 0 else None
+
+    fields["titles"] = {}
+    for localised in get_xpath(f"{citation}//gmd:LocalisedCharacterString")(metadata):
+        if localised.text is not None:
+            fields["titles"][localised.get("locale", "").lstrip("#")] = localised.text
+
+    return fields
+
+
+def uuid_to_filename(uuid: str) -> str:
+    """Replace characters of the uuid not allowed in file names"""
+
+    return uuid.replace(":", "_").replace("/", "_").replace("\\", "_").replace("'", "_").replace('"', "_")
 
 
 def xmlify(string: str) -> str:
@@ -151,6 +273,8 @@ def get_search_query(with_harvested: bool = True, valid_only: bool = False, publ
                     not_in_groups: list = None, keywords: list = None, q: str = None) -> dict:
     """
     Returns the query syntax for ES search API.
+    All parameters are compiled into term(s) clauses of the filter context (cached by ES,
+    no scoring). Only q is placed in the must clause as query string.
     
     Parameters:
         with_harvested (bool): fetches harvested records as well
@@ -168,47 +292,65 @@ def get_search_query(with_harvested: bool = True, valid_only: bool = False, publ
 
     query = {
         "bool": {
-            "must": []
+            "filter": []
         }
     }
 
     if with_templates:
-        query["bool"]["must"].append({"terms": {"isTemplate": ["y", "n"]}})
+        query["bool"]["filter"].append({"terms": {"isTemplate": ["y", "n"]}})
     else:
-        query["bool"]["must"].append({"terms": {"isTemplate": ["n"]}})
-
-    query_string = str()
+        query["bool"]["filter"].append({"terms": {"isTemplate": ["n"]}})
 
     if not with_harvested:
-        query_string = query_string + "(isHarvested:\"false\") AND"
+        query["bool"]["filter"].append({"term": {"isHarvested": "false"}})
 
     if valid_only:
-        query_string = query_string + "(valid:\"1\") AND"
+        query["bool"]["filter"].append({"term": {"valid": "1"}})
 
     if published_only:
-        query_string = query_string + "(isPublishedToAll:\"true\") AND"
+        query["bool"]["filter"].append({"term": {"isPublishedToAll": "true"}})
 
     if in_groups is not None:
-        toadd = " OR ".join([f"groupOwner:\"{i}\"" for i in in_groups])
-        query_string = query_string + f"({toadd}) AND"
+        query["bool"]["filter"].append({"terms": {"groupOwner": [str(i) for i in in_groups]}})
 
     if not_in_groups is not None:
-        toadd = " OR ".join([f"-groupOwner:\"{i}\"" for i in not_in_groups])
-        query_string = query_string + f"({toadd}) AND"
+        query["bool"]["must_not"] = [{"terms": {"groupOwner": [str(i) for i in not_in_groups]}}]
 
     if keywords is not None:
-        query_kw = " OR ".join([f"tag.default:\"{i}\" OR tag.langfre:\"{i}\"" \
-            f"OR tag.langger:\"{i}\" OR tag.langita:\"{i}\" OR tag.langeng:\"{i}\""
-            for i in keywords])
-
-        query_string = query_string + f"({query_kw}) AND"
+        query["bool"]["filter"].append({
+            "bool": {
+                "should": [{"terms": {field: list(keywords)}} for field in settings.KEYWORD_FIELDS],
+                "minimum_should_match": 1
+            }
+        })
 
     if q is not None:
-        query_string = query_string + f"({q}) AND"
+        query["bool"]["must"] = [{"query_string": {"query": q, "default_operator": "AND"}}]
 
-    if len(query_string) > 0:
-        query_string = query_string[:-4]
-        query["bool"]["must"].insert(0, {"query_string": {"query": query_string,
-                "default_operator": "AND"}})
-    
     return query
+
+
+def is_published_only(query: dict) -> bool:
+    """
+    Tells if an ES query only matches published records, either by a term filter
+    on isPublishedToAll or by a query string (legacy queries).
+    """
+
+    clauses = query.get("bool", {})
+
+    filters = clauses.get("filter", [])
+    if isinstance(filters, dict):
+        filters = [filters]
+
+    if {"term": {"isPublishedToAll": "true"}} in filters:
+        return True
+
+    musts = clauses.get("must", [])
+    if isinstance(musts, dict):
+        musts = [musts]
+
+    for clause in musts:
+        if "(isPublishedToAll:\"true\")" in clause.get("query_string", {}).get("query", ""):
+            return True
+
+    return False
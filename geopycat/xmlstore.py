@@ -0,0 +1,234 @@
+import os
+import sqlite3
+import threading
+from geopycat import settings
+from geopycat import utils
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+PACK_FILE = "records.pack"
+INDEX_FILE = "index.sqlite"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS records (
+    uuid TEXT PRIMARY KEY,
+    offset INTEGER,
+    size INTEGER,
+    raw_size INTEGER
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value BLOB
+);
+"""
+
+
+def check_zstandard():
+    """Raises an exception if zstandard (optional dependency) is not installed"""
+
+    if zstandard is None:
+        raise Exception("zstandard is needed for packed XML backups : pip install zstandard")
+
+
+def train_dictionary(samples: list, size: int = settings.XML_PACK_DICT_SIZE) -> bytes:
+    """
+    Trains a zstd dictionary on sample records (list of XML as bytes).
+    Returns an empty dictionary (records compressed without dictionary) if there
+    are too few samples to train one.
+    """
+
+    check_zstandard()
+
+    try:
+        return zstandard.train_dictionary(size, samples).as_bytes()
+    except zstandard.ZstdError:
+        return b""
+
+
+class PackedXMLStore():
+    """
+    Store of XML records compressed one by one with a shared zstd dictionary, trained on
+    records of the same kind, and appended to a single pack file. An SQLite index gives
+    the position of each record, so that a single record is read with one seek.
+    The store is a directory holding records.pack and index.sqlite.
+
+        with PackedXMLStore("backup", mode="w", dictionary=train_dictionary(samples)) as store:
+            store.write(uuid, xml)
+
+        with PackedXMLStore("backup") as store:
+            xml = store.read(uuid)
+
+    Parameters :
+        path (str): path of the store directory
+        mode (str): 'r' to read or 'w' to create the store (an existing store is replaced)
+        dictionary (bytes): zstd dictionary used in 'w' mode (see train_dictionary)
+        level (int): zstd compression level used in 'w' mode
+    """
+
+    def __init__(self, path: str, mode: str = "r", dictionary: bytes = b"",
+                    level: int = settings.XML_PACK_LEVEL):
+
+        check_zstandard()
+
+        if mode not in ["r", "w"]:
+            raise ValueError(f"Unknown mode : {mode}, must be 'r' or 'w'")
+
+        self.path = path
+        self.mode = mode
+        self.__lock = threading.Lock()
+        self.__pending = 0
+
+        pack_path = os.path.join(path, PACK_FILE)
+        index_path = os.path.join(path, INDEX_FILE)
+
+        if mode == "w":
+
+            if not os.path.isdir(path):
+                os.makedirs(path)
+
+            for file in [pack_path, index_path]:
+                if os.path.isfile(file):
+                    os.remove(file)
+
+            self.__index = sqlite3.connect(index_path, check_same_thread=False)
+            self.__index.executescript(SCHEMA)
+            self.__index.execute("INSERT INTO meta VALUES ('dictionary', ?)", (dictionary,))
+            self.__index.commit()
+
+            # Opened for reading as well, so that records can be read while writing
+            self.__pack = open(pack_path, "w+b")
+
+        else:
+
+            if not os.path.isfile(index_path):
+                raise Exception(f"No packed XML store : {path}")
+
+            self.__index = sqlite3.connect(index_path, check_same_thread=False)
+            dictionary = self.__index.execute(
+                "SELECT value FROM meta WHERE key = 'dictionary'").fetchone()[0]
+
+            self.__pack = open(pack_path, "rb")
+
+        zstd_dictionary = zstandard.ZstdCompressionDict(dictionary) if dictionary else None
+
+        self.__compressor = zstandard.ZstdCompressor(level=level, dict_data=zstd_dictionary)
+        self.__decompressor = zstandard.ZstdDecompressor(dict_data=zstd_dictionary)
+
+    def write(self, uuid: str, xml: bytes):
+        """Compresses and appends a record to the store. A record written twice is replaced."""
+
+        with self.__lock:
+
+            data = self.__compressor.compress(xml)
+            offset = self.__pack.seek(0, os.SEEK_END)
+            self.__pack.write(data)
+
+            self.__index.execute("INSERT OR REPLACE INTO records VALUES (?, ?, ?, ?)",
+                                    (uuid, offset, len(data), len(xml)))
+            self.__pending += 1
+
+            if self.__pending >= 1000:
+                self.__flush()
+
+    def __flush(self):
+        self.__pack.flush()
+        self.__index.commit()
+        self.__pending = 0
+
+    def read(self, uuid: str) -> bytes:
+        """Returns the XML of a record, None if not in the store"""
+
+        with self.__lock:
+
+            row = self.__index.execute("SELECT offset, size FROM records WHERE uuid = ?",
+                                        (uuid,)).fetchone()
+
+            if row is None:
+                return None
+
+            self.__pack.seek(row[0])
+            return self.__decompressor.decompress(self.__pack.read(row[1]))
+
+    def get_uuids(self) -> list:
+        """Returns the uuids of the records in the store"""
+
+        with self.__lock:
+            return [row[0] for row in self.__index.execute("SELECT uuid FROM records ORDER BY uuid")]
+
+    def __iter__(self):
+        """Yields (uuid, XML) for every record, in the order of the pack file"""
+
+        for uuid in [row[0] for row in self.__index.execute(
+                        "SELECT uuid FROM records ORDER BY offset")]:
+            yield uuid, self.read(uuid)
+
+    def __len__(self) -> int:
+        return self.__index.execute("SELECT count(*) FROM records").fetchone()[0]
+
+    def get_stats(self) -> dict:
+        """Returns {"records": int, "raw_bytes": int, "packed_bytes": int, "ratio": float}"""
+
+        records, raw, packed = self.__index.execute(
+            "SELECT count(*), coalesce(sum(raw_size), 0), coalesce(sum(size), 0) FROM records").fetchone()
+
+        return {"records": records, "raw_bytes": raw, "packed_bytes": packed,
+                "ratio": round(raw / packed, 1) if packed > 0 else None}
+
+    def close(self):
+        """Writes the index and closes the store"""
+
+        with self.__lock:
+            if self.mode == "w":
+                self.__flush()
+            self.__pack.close()
+            self.__index.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+
+def pack_xml_folder(folder: str, path: str, samples: int = settings.XML_PACK_SAMPLES) -> dict:
+    """
+    Packs the XML files of a folder (e.g. a Subtemplates_* folder of a GeocatBackup or the
+    output of backup_metadata_xml) into a PackedXMLStore. The dictionary is trained on the
+    first samples files. Records are named after the file names without extension.
+
+    Parameters:
+        folder (str): path of the folder of XML files
+        path (str): path of the store directory
+        samples (int): number of files the dictionary is trained on
+
+    Returns:
+        The stats of the store (see PackedXMLStore.get_stats)
+    """
+
+    files = sorted(file for file in os.listdir(folder) if file.endswith(".xml"))
+
+    def read(file):
+        with open(os.path.join(folder, file), "rb") as xml:
+            return xml.read()
+
+    dictionary = train_dictionary([read(file) for file in files[:samples]])
+
+    print("Pack XML : ", end="\r")
+
+    with PackedXMLStore(path, mode="w", dictionary=dictionary) as store:
+
+        for count, file in enumerate(files, 1):
+            store.write(os.path.splitext(file)[0], read(file))
+            print(f"Pack XML : {round((count / len(files)) * 100, 1)}%", end="\r")
+
+        stats = store.get_stats()
+
+    print(f"Pack XML : {utils.okgreen('Done')} ({stats['records']} records, "
+            f"compression ratio {stats['ratio']})")
+
+    return stats
@@ -27,6 +27,10 @@ setuptools.setup(
         'python-dateutil >= 2.8.1',
         'lxml >= 4.8.0'
     ],
+    extras_require={
+        'snapshot': ['pyarrow >= 10.0.0'],
+        'packed': ['zstandard >= 0.18.0'],
+    },
     scripts=[
         'bin/geocat_backup.py',
         'bin/geocat_backup',
@@ -35,6 +39,12 @@ setuptools.setup(
         'bin/save_and_close.py',
         'bin/save_and_close',
         'bin/restore_mef.py',
-        'bin/restore_mef'
+        'bin/restore_mef',
+        'bin/index_backup.py',
+        'bin/index_backup',
+        'bin/verify_backup.py',
+        'bin/verify_backup',
+        'bin/sync_mirror.py',
+        'bin/sync_mirror'
     ]
 )